@@ -1,7 +1,7 @@
 import logging
-import re
 import os
 
+import httpx
 from sqlalchemy import func, select
 from telegram import KeyboardButton, ReplyKeyboardMarkup
 from telegram.ext import (
@@ -11,197 +11,163 @@ from telegram.ext import (
     MessageHandler,
     filters,
 )
+from telegram.request import HTTPXRequest
 
+import src.concurrency as concurrency
 import src.database as database
-from src.main_menu import *
-from src.mindflow import *
-from src.reflection import *
-from src.reminders import *
-from src.settings import *
+import src.instrumentation as instrumentation
+import src.main_menu as main_menu
+import src.maintenance as maintenance
+import src.mindflow as mindflow
+import src.persistence as persistence
+import src.reflection as reflection
+import src.reminders as reminders
+import src.router as router
+import src.scheduler as scheduler
+import src.settings as settings
+import src.speech_clients as speech_clients
+import src.transcriber as transcriber
+import src.transcription_cache as transcription_cache
+import src.user_settings as user_settings
+import src.writer as writer
 
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.DEBUG
 )
 logging.getLogger("httpx").setLevel(logging.WARNING)
 
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+BOT_API_BASE_URL = os.getenv("BOT_API_BASE_URL", "https://api.telegram.org/bot")
+BOT_HTTP_POOL_SIZE = int(os.getenv("BOT_HTTP_POOL_SIZE", 64))
+BOT_HTTP_KEEPALIVE = float(os.getenv("BOT_HTTP_KEEPALIVE", 60))
+BOT_HTTP_TIMEOUT = float(os.getenv("BOT_HTTP_TIMEOUT", 10))
+
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8443))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", None)
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", None)
+
 
 async def start_command(update, context):
     await update.message.reply_text("Привет! 🍓")
-    return await handle_main_menu(update, context)
+    return await main_menu.handle_main_menu(update, context)
 
 
-async def handle_messages(update, context):
-    user_context = context.user_data.get("context", None)
+def make_request(pool_size=BOT_HTTP_POOL_SIZE, read_timeout=BOT_HTTP_TIMEOUT):
+    request_class = HTTPXRequest
+    if instrumentation.METRICS_ENABLED:
+        request_class = instrumentation.InstrumentedRequest
 
-    if user_context == "ENTERING_MINDFLOW":
-        return await handle_mindflow_adding(update, context)
+    # Держим соединения с Bot API открытыми, чтобы ответы не ждали TLS-рукопожатия
+    return request_class(
+        connection_pool_size=pool_size,
+        connect_timeout=5,
+        read_timeout=read_timeout,
+        write_timeout=BOT_HTTP_TIMEOUT,
+        pool_timeout=3,
+        httpx_kwargs={
+            "limits": httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=BOT_HTTP_KEEPALIVE,
+            )
+        },
+    )
 
-    elif user_context == "ENTERING_REFLECTION_TIME_SPENT":
-        return await handle_reflection_time_spent(update, context)
-    elif user_context == "ENTERING_REFLECTION_INTERRUPT":
-        return await handle_reflection_interrupt(update, context)
 
-    elif user_context == "ENTERING_REMINDER_SCHEDULED_AT":
-        return await handle_reminders_scheduled_at(update, context)
-    elif user_context == "ENTERING_REMINDER_HEADER":
-        return await handle_reminders_header(update, context)
+async def post_init(application):
+    await database.init()
+    await scheduler.start(application.bot)
+    maintenance.start()
+    writer.start()
+    transcriber.start()
+    instrumentation.start()
 
-    elif user_context == "ENTERING_SALUTE_SPEECH_TOKEN":
-        return await handle_salute_speech_entering(update, context)
 
-    else:
-        return await update.message.reply_text(
-            "Что-то непонятное... 😴\n" "Попробуй ещё раз!"
-        )
+async def post_stop(application):
+    # Бот ещё инициализирован, а persistence не сброшен: принятые голосовые
+    # успеют скачаться, ответить пользователю и сохраниться
+    instrumentation.stop()
+    await transcriber.stop()
+    await writer.stop()
+    await maintenance.stop()
+    await scheduler.stop()
 
 
-async def post_init(application):
-    await database.init()
+async def post_shutdown(application):
+    for engine in database.engines:
+        await engine.dispose()
 
 
 if __name__ == "__main__":
     api_token = os.getenv("API_TOKEN")
 
+    bot_persistence = persistence.DatabasePersistence()
+
     application = (
         ApplicationBuilder()
         .token(api_token)
+        .base_url(BOT_API_BASE_URL)
+        .request(make_request())
+        .get_updates_request(make_request(pool_size=2, read_timeout=30))
+        .persistence(bot_persistence)
+        .concurrent_updates(concurrency.UserUpdateProcessor())
         .post_init(post_init)
+        .post_stop(post_stop)
+        .post_shutdown(post_shutdown)
         .build()
     )
 
-    start_command_handler = CommandHandler("start", start_command)
+    start_command_handler = CommandHandler(
+        "start", instrumentation.instrument(start_command)
+    )
     application.add_handler(start_command_handler)
 
-    # MindFlow
-    application.add_handler(
-        MessageHandler(filters.Regex(re.compile(r"^MindFlow 🗒$")), handle_mindflow_menu)
-    )
-    application.add_handler(
-        MessageHandler(
-            filters.Regex(re.compile(r"^Добавить 🖊 \(M\)$")), handle_mindflow_add
-        )
-    )
-    application.add_handler(
-        MessageHandler(
-            filters.Regex(re.compile(r"^Смотреть 👀 \(M\)$")), handle_mindflow_show
-        )
-    )
-    application.add_handler(
-        MessageHandler(
-            filters.Regex(re.compile(r"^Назад ⬅️ \(M\)$")), handle_mindflow_back
-        )
-    )
-    application.add_handler(
-        MessageHandler(
-            filters.Regex(re.compile(r"^Вперёд ➡️ \(M\)$")), handle_mindflow_forward
+    if instrumentation.METRICS_ENABLED:
+        application.add_handler(
+            CommandHandler("metrics", instrumentation.handle_metrics)
         )
-    )
-    application.add_handler(
-        MessageHandler(
-            filters.Regex(re.compile(r"^В начало ⬅️ \(M\)$")), handle_mindflow_begin
-        )
-    )
-    application.add_handler(
-        MessageHandler(
-            filters.Regex(re.compile(r"^В конец ➡️ \(M\)$")), handle_mindflow_end
-        )
-    )
 
-    # Reflection
-    application.add_handler(
-        MessageHandler(
-            filters.Regex(re.compile(r"^Reflection 💤$")), handle_reflection_menu
-        )
-    )
-    application.add_handler(
-        MessageHandler(
-            filters.Regex(re.compile(r"^Добавить 🖊 \(R\)$")), handle_reflection_add
-        )
-    )
-    application.add_handler(
-        MessageHandler(
-            filters.Regex(re.compile(r"^Смотреть 👀 \(R\)$")), handle_reflection_show
-        )
-    )
-    application.add_handler(
-        MessageHandler(
-            filters.Regex(re.compile(r"^Назад ⬅️ \(R\)$")), handle_reflection_back
-        )
-    )
-    application.add_handler(
-        MessageHandler(
-            filters.Regex(re.compile(r"^Вперёд ➡️ \(R\)$")), handle_reflection_forward
+    # Кнопки и состояния диалога разбирает роутер по таблицам модулей
+    for module in (main_menu, mindflow, reflection, reminders, settings):
+        router.register(
+            instrumentation.instrument_all(module.ROUTES),
+            instrumentation.instrument_all(module.STATES),
         )
-    )
-    application.add_handler(
-        MessageHandler(
-            filters.Regex(re.compile(r"^В начало ⬅️ \(R\)$")), handle_reflection_begin
-        )
-    )
-    application.add_handler(
-        MessageHandler(
-            filters.Regex(re.compile(r"^В конец ➡️ \(R\)$")), handle_reflection_end
-        )
-    )
 
-    # Напоминания
-    application.add_handler(
-        MessageHandler(
-            filters.Regex(re.compile(r"^Напоминания 📌$")), handle_reminders_menu
-        )
-    )
-    application.add_handler(
-        MessageHandler(
-            filters.Regex(re.compile(r"^Добавить 🖊 \(Н\)$")), handle_reminders_add
-        )
-    )
-    application.add_handler(
-        MessageHandler(
-            filters.Regex(re.compile(r"^Смотреть 👀 \(Н\)$")), handle_reminders_show
-        )
-    )
-    application.add_handler(
-        MessageHandler(
-            filters.Regex(re.compile(r"^Назад ⬅️ \(Н\)$")), handle_reminders_back
-        )
-    )
-    application.add_handler(
-        MessageHandler(
-            filters.Regex(re.compile(r"^Вперёд ➡️ \(Н\)$")), handle_reminders_forward
-        )
-    )
-    application.add_handler(
-        MessageHandler(
-            filters.Regex(re.compile(r"^В начало ⬅️ \(Н\)$")), handle_reminders_begin
-        )
-    )
-    application.add_handler(
-        MessageHandler(
-            filters.Regex(re.compile(r"^В конец ➡️ \(Н\)$")), handle_reminders_end
-        )
+    instrumentation.register("updates", concurrency.metrics)
+    instrumentation.register_labelled(
+        "updates_user", "user", concurrency.get_user_metrics
     )
+    instrumentation.register("transcriber", transcriber.metrics)
+    instrumentation.register("transcription_cache", transcription_cache.metrics)
+    instrumentation.register("speech_clients", speech_clients.metrics)
+    instrumentation.register("user_settings", user_settings.metrics)
+    instrumentation.register("writer", writer.metrics)
+    instrumentation.register("scheduler", scheduler.metrics)
+    instrumentation.register("persistence", bot_persistence.metrics)
 
-    # Настройки
-    application.add_handler(
-        MessageHandler(
-            filters.Regex(re.compile(r"^Настройки ⚙️$")), handle_settings_menu
-        )
-    )
     application.add_handler(
         MessageHandler(
-            filters.Regex(re.compile(r"^SaluteSpeech 🎉$")), handle_salute_speech
+            (filters.TEXT & ~filters.COMMAND) | filters.VOICE, router.dispatch
         )
     )
 
-    application.add_handler(
-        MessageHandler(
-            filters.Regex(re.compile(r"^В главное меню 🫆$")), handle_main_menu
-        )
-    )
-    application.add_handler(
-        MessageHandler(
-            (filters.TEXT & ~filters.COMMAND) | filters.VOICE, handle_messages
-        )
-    )
+    if BOT_MODE == "webhook":
+        # Без URL PTB зарегистрирует http://0.0.0.0:..., а без секрета
+        # поддельные апдейты за любого пользователя может прислать кто угодно
+        if not WEBHOOK_URL or not WEBHOOK_SECRET:
+            raise ValueError(
+                "Для BOT_MODE=webhook нужно задать WEBHOOK_URL и WEBHOOK_SECRET"
+            )
 
-    application.run_polling()
+        application.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=WEBHOOK_PATH,
+            webhook_url=WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET,
+        )
+    else:
+        application.run_polling()
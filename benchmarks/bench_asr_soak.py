@@ -0,0 +1,118 @@
+import asyncio
+import datetime as dt
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from types import SimpleNamespace
+
+import src.asr as asr
+import src.database as database
+import src.transcriber as transcriber
+import src.writer as writer
+from src.mindflow import handle_mindflow_adding
+
+DURATION = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+USERS = 200
+VOICE_INTERVAL = 30
+VOICE_SIZE = 32 * 1024
+
+results = {"saved": [], "failed": 0, "shed": 0}
+
+
+class File:
+    async def download_to_memory(self, out):
+        out.write(bytes(VOICE_SIZE))
+
+
+async def get_file(file_id):
+    return File()
+
+
+def make_update(user_id):
+    sent_at = time.perf_counter()
+
+    async def reply_text(text, **kwargs):
+        if text.startswith("Мысль успешно"):
+            results["saved"].append(time.perf_counter() - sent_at)
+        elif text.startswith("Не удалось"):
+            results["failed"] += 1
+        elif text.startswith("Сейчас слишком много"):
+            results["shed"] += 1
+
+    voice = SimpleNamespace(
+        file_id="voice", file_unique_id=str(uuid.uuid4()), file_size=VOICE_SIZE
+    )
+    message = SimpleNamespace(
+        text=None,
+        voice=voice,
+        date=dt.datetime.now(dt.timezone.utc),
+        chat_id=user_id,
+        reply_text=reply_text,
+    )
+    update = SimpleNamespace(
+        message=message,
+        effective_message=message,
+        effective_user=SimpleNamespace(id=user_id),
+    )
+    context = SimpleNamespace(bot=SimpleNamespace(get_file=get_file), user_data={})
+    return update, context
+
+
+async def user(user_id, deadline):
+    while True:
+        delay = random.expovariate(1 / VOICE_INTERVAL)
+        if time.perf_counter() + delay > deadline:
+            return
+
+        await asyncio.sleep(delay)
+        update, context = make_update(user_id)
+        await handle_mindflow_adding(update, context)
+
+
+async def main():
+    # Параметры распознавания задаются через ASR_FAKE_*
+    asr.provider = asr.FakeProvider()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = database.make_engine(
+            f"sqlite+aiosqlite:///{os.path.join(tmp, 'soak.db')}"
+        )
+        database.bind(engine)
+        await database.init()
+        writer.start()
+        transcriber.start()
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(user(user_id, start + DURATION) for user_id in range(USERS))
+        )
+        await transcriber.stop()
+        elapsed = time.perf_counter() - start
+
+        await writer.stop()
+        await engine.dispose()
+
+    saved = sorted(results["saved"])
+    print(
+        f"{USERS} users, {DURATION:.0f} s, {transcriber.WORKERS} workers, "
+        f"ASR {asr.FAKE_LATENCY} s / {asr.FAKE_CONCURRENCY} concurrent"
+    )
+    print(f"saved    {len(saved)} ({len(saved) / elapsed:.1f} notes/s)")
+    print(f"failed   {results['failed']}, shed {results['shed']}")
+    if saved:
+        print(
+            f"latency  p50 {statistics.median(saved):.3f} s, "
+            f"p99 {saved[int(len(saved) * 0.99)]:.3f} s, max {saved[-1]:.3f} s"
+        )
+    print(
+        f"queue    max depth {transcriber.metrics['max_depth']}, "
+        f"max wait {transcriber.metrics['max_wait']:.3f} s"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
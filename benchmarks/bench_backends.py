@@ -0,0 +1,124 @@
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import text
+
+import src.database as database
+import src.migrations as migrations
+import src.paginator as paginator
+import src.stats as stats
+import src.writer as writer
+
+INSERTS = 2_000
+PRODUCERS = 50
+USERS = 200
+READS = 500
+
+# Например: postgresql+asyncpg://postgres@localhost:5432/bench (база будет очищена)
+POSTGRES_URL = os.getenv("BENCH_POSTGRES_URL", None)
+
+
+async def prepare(engine):
+    async with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            await conn.run_sync(database.Base.metadata.drop_all)
+            await conn.execute(text("DROP TABLE IF EXISTS schema_version"))
+        await conn.run_sync(database.Base.metadata.create_all)
+        await conn.run_sync(migrations.upgrade)
+
+
+async def produce(producer):
+    for i in range(INSERTS // PRODUCERS):
+        await writer.add(
+            database.Mindflow(
+                user_id=(producer * 31 + i) % USERS,
+                last_modified=time.time(),
+                notes="мысль",
+            )
+        )
+
+
+async def measure_inserts(group_commit):
+    if group_commit:
+        writer.start()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(produce(producer) for producer in range(PRODUCERS)))
+    elapsed = time.perf_counter() - start
+
+    if group_commit:
+        await writer.stop()
+
+    return INSERTS / elapsed
+
+
+async def measure_navigation():
+    start = time.perf_counter()
+    for _ in range(READS):
+        paginator.invalidate(database.Mindflow)
+        await paginator.load(database.Mindflow, random.randrange(USERS))
+    return READS / (time.perf_counter() - start)
+
+
+async def measure_stats():
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(stats.get_reflection_stats(random.randrange(USERS)) for _ in range(READS))
+    )
+    return READS / (time.perf_counter() - start)
+
+
+async def measure_upserts():
+    async def upsert(user_id):
+        async with database.get_session(user_id) as session:
+            await session.execute(
+                database.upsert(
+                    database.Setting,
+                    {"user_id": user_id, "salute_speech": f"token-{user_id}"},
+                    index_elements=["user_id"],
+                    update_columns=["salute_speech"],
+                )
+            )
+
+    start = time.perf_counter()
+    await asyncio.gather(*(upsert(random.randrange(USERS)) for _ in range(READS)))
+    return READS / (time.perf_counter() - start)
+
+
+async def run(name, url):
+    engine = database.make_engine(url)
+    database.bind(engine)
+    await prepare(engine)
+
+    direct = await measure_inserts(group_commit=False)
+    batched = await measure_inserts(group_commit=True)
+    navigation = await measure_navigation()
+    reads = await measure_stats()
+    upserts = await measure_upserts()
+
+    await engine.dispose()
+
+    print(
+        f"{name:>10} | вставки {direct:6.0f} ins/s, group commit {batched:6.0f} ins/s | "
+        f"окна {navigation:6.0f} /s | статистика {reads:6.0f} /s | "
+        f"upsert {upserts:6.0f} /s"
+    )
+
+
+async def main():
+    await run("memory", "sqlite+aiosqlite:///:memory:")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        await run("sqlite", f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+
+    if POSTGRES_URL:
+        await run("postgresql", POSTGRES_URL)
+    else:
+        print("postgresql | пропущено: задайте BENCH_POSTGRES_URL")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
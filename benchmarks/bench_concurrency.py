@@ -0,0 +1,118 @@
+import asyncio
+import datetime as dt
+import json
+import random
+import time
+
+from telegram import Chat, Message, Update, User
+from telegram.ext import ApplicationBuilder, MessageHandler, filters
+from telegram.request import BaseRequest
+
+import src.concurrency as concurrency
+
+UPDATES = 2_000
+USERS = (1, 10, 100)
+# Обработчик в основном ждёт базу и Bot API; изредка - долгое распознавание
+HANDLER_TIME = 0.005
+SLOW_HANDLER_TIME = 0.2
+SLOW_SHARE = 0.01
+
+
+class StubRequest(BaseRequest):
+    # Bot API не нужен: getMe при initialize отвечаем сами
+    read_timeout = None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        me = {"id": 1, "is_bot": True, "first_name": "bot", "username": "bot"}
+        return 200, json.dumps({"ok": True, "result": me}).encode()
+
+
+def make_update(update_id, user_id):
+    message = Message(
+        message_id=update_id,
+        date=dt.datetime.now(dt.timezone.utc),
+        chat=Chat(id=user_id, type="private"),
+        from_user=User(id=user_id, first_name="user", is_bot=False),
+        text=str(update_id),
+    )
+    return Update(update_id=update_id, message=message)
+
+
+async def measure(concurrent_updates, users):
+    seen = {}
+    running = set()
+    violations = 0
+    rng = random.Random(users)
+
+    async def handle(update, context):
+        # Нарушение - второй апдейт пользователя, пока первый ещё не закончен,
+        # или апдейт раньше уже обработанного: так и ломается машина состояний
+        nonlocal violations
+        user_id = update.effective_user.id
+        if user_id in running or seen.get(user_id, -1) > update.update_id:
+            violations += 1
+        seen[user_id] = update.update_id
+
+        running.add(user_id)
+        slow = rng.random() < SLOW_SHARE
+        await asyncio.sleep(SLOW_HANDLER_TIME if slow else HANDLER_TIME)
+        running.discard(user_id)
+
+    application = (
+        ApplicationBuilder()
+        .token("0:benchmark")
+        .request(StubRequest())
+        .get_updates_request(StubRequest())
+        .concurrent_updates(concurrent_updates)
+        .build()
+    )
+    application.add_handler(MessageHandler(filters.TEXT, handle))
+    await application.initialize()
+    await application.start()
+
+    start = time.perf_counter()
+    for update_id in range(UPDATES):
+        await application.update_queue.put(make_update(update_id, update_id % users))
+    await application.update_queue.join()
+    elapsed = time.perf_counter() - start
+
+    await application.stop()
+    await application.shutdown()
+    return UPDATES / elapsed, violations
+
+
+async def main():
+    cases = {
+        "по одному": lambda: False,
+        "concurrent_updates(32)": lambda: 32,
+        "UserUpdateProcessor": lambda: concurrency.UserUpdateProcessor(workers=32),
+    }
+    for users in USERS:
+        for name, make in cases.items():
+            for key in ("max_queued", "total_wait", "max_wait", "processed"):
+                concurrency.metrics[key] = 0
+            processor = make()
+            throughput, violations = await measure(processor, users)
+
+            line = (
+                f"{users:>3} польз. | {name:<22} | {throughput:7.0f} upd/s | "
+                f"нарушений порядка {violations:4}"
+            )
+            if isinstance(processor, concurrency.UserUpdateProcessor):
+                metrics = concurrency.metrics
+                line += (
+                    f" | очередь до {metrics['max_queued']:4}, ожидание "
+                    f"сред. {metrics['total_wait'] / metrics['processed'] * 1000:6.1f}"
+                    f" / макс. {metrics['max_wait'] * 1000:6.1f} ms"
+                )
+            print(line)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
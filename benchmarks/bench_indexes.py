@@ -0,0 +1,94 @@
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import src.database as database
+import src.migrations as migrations
+
+NOTES_PER_USER = 50
+QUERIES = 200
+
+
+async def prepare(engine, rows):
+    users = max(rows // NOTES_PER_USER, 1)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(database.Base.metadata.create_all)
+        for table in database.Base.metadata.sorted_tables:
+            for index in table.indexes:
+                await conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+
+        batch = []
+        for i in range(rows):
+            batch.append(
+                {
+                    "id": str(uuid.uuid4()),
+                    "user_id": i % users,
+                    "last_modified": float(i),
+                    "notes": "мысль",
+                }
+            )
+            if len(batch) == 10_000:
+                await conn.execute(insert(database.Mindflow), batch)
+                batch = []
+        if batch:
+            await conn.execute(insert(database.Mindflow), batch)
+
+    return users
+
+
+async def measure(engine, users):
+    timings = []
+    async with engine.connect() as conn:
+        for _ in range(QUERIES):
+            user_id = random.randrange(users)
+            start = time.perf_counter()
+            await conn.execute(
+                select(func.count())
+                .select_from(database.Mindflow)
+                .where(database.Mindflow.user_id == user_id)
+            )
+            await conn.execute(
+                select(database.Mindflow)
+                .where(database.Mindflow.user_id == user_id)
+                .order_by(database.Mindflow.last_modified)
+                .limit(1)
+            )
+            timings.append(time.perf_counter() - start)
+
+    return statistics.median(timings) * 1000
+
+
+async def run(rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+        users = await prepare(engine, rows)
+        before = await measure(engine, users)
+
+        async with engine.begin() as conn:
+            await conn.run_sync(migrations.upgrade)
+        after = await measure(engine, users)
+
+        await engine.dispose()
+
+    print(
+        f"{rows:>8} rows | без индексов {before:8.3f} ms | с индексами {after:8.3f} ms"
+    )
+
+
+async def main():
+    for rows in (1_000, 10_000, 100_000, 300_000):
+        await run(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,248 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from telegram import Update
+from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters
+from telegram.request import BaseRequest
+
+import app
+import src.database as database
+import src.main_menu as main_menu
+import src.mindflow as mindflow
+import src.persistence as persistence
+import src.reflection as reflection
+import src.reminders as reminders
+import src.router as router
+import src.settings as settings
+
+# Сценарии сессий: (шаг, текст сообщения); шаг нужен только для отчёта
+SESSIONS = {
+    "mindflow": [
+        ("menu", "MindFlow 🗒"),
+        ("add", "Добавить 🖊 (M)"),
+        ("save", "Заметка из нагрузочного теста"),
+        ("show", "Смотреть 👀 (M)"),
+        ("page", "Вперёд ➡️ (M)"),
+        ("page", "В конец ➡️ (M)"),
+        ("home", "В главное меню 🫆"),
+    ],
+    "reflection": [
+        ("menu", "Reflection 💤"),
+        ("add", "Добавить 🖊 (R)"),
+        ("input", "Средне 🕰\n(<= 6 ч.)"),
+        ("save", "Да 😎"),
+        ("show", "Смотреть 👀 (R)"),
+        ("page", "Назад ⬅️ (R)"),
+        ("home", "В главное меню 🫆"),
+    ],
+    "reminders": [
+        ("menu", "Напоминания 📌"),
+        ("add", "Добавить 🖊 (Н)"),
+        ("input", "3 дня 🎈"),
+        ("save", "Напоминание из нагрузочного теста"),
+        ("show", "Смотреть 👀 (Н)"),
+        ("page", "В начало ⬅️ (Н)"),
+        ("home", "В главное меню 🫆"),
+    ],
+}
+
+# Шаг, внутри которого сейчас идёт запрос: SQL вне шагов (writer и т.п.) - фон
+current_step = ContextVar("step", default="background")
+
+
+class RecordingRequest(BaseRequest):
+    # Заглушка Bot API: отвечает сама и запоминает, что бот отправил
+    read_timeout = None
+
+    def __init__(self):
+        self.sent = []
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        endpoint = url.rsplit("/", 1)[-1]
+        if endpoint == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "bot", "username": "bot"}
+            return 200, json.dumps({"ok": True, "result": result}).encode()
+
+        parameters = request_data.parameters if request_data else {}
+        self.sent.append((endpoint, parameters.get("chat_id"), parameters.get("text")))
+        result = {
+            "message_id": len(self.sent),
+            "date": int(time.time()),
+            "chat": {"id": parameters.get("chat_id", 0), "type": "private"},
+            "text": parameters.get("text") or "",
+        }
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+def make_update(application, update_id, user_id, text):
+    user = {"id": user_id, "is_bot": False, "first_name": "user"}
+    data = {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": user,
+            "text": text,
+        },
+    }
+    return Update.de_json(data, application.bot)
+
+
+def build(request):
+    application = (
+        ApplicationBuilder()
+        .token("0:load")
+        .request(request)
+        .get_updates_request(RecordingRequest())
+        .persistence(persistence.DatabasePersistence())
+        .build()
+    )
+    application.add_handler(CommandHandler("start", app.start_command))
+    application.add_handler(
+        MessageHandler(
+            (filters.TEXT & ~filters.COMMAND) | filters.VOICE, router.dispatch
+        )
+    )
+    return application
+
+
+async def run_user(application, user_id, rounds, think, latencies, steps_done):
+    for _ in range(rounds):
+        for name, steps in SESSIONS.items():
+            for step, text in steps:
+                step = f"{name}.{step}"
+                steps_done[step] = steps_done.get(step, 0) + 1
+                update_id = sum(steps_done.values())
+                update = make_update(application, update_id, user_id, text)
+
+                token = current_step.set(step)
+                started = time.perf_counter()
+                await application.process_update(update)
+                latencies.append((step, time.perf_counter() - started))
+                current_step.reset(token)
+
+                if think:
+                    await asyncio.sleep(think)
+
+
+async def measure(users, rounds, think, tmp):
+    engine = database.make_engine(
+        f"sqlite+aiosqlite:///{os.path.join(tmp, f'load_{users}.db')}"
+    )
+    database.bind(engine)
+
+    statements = {}
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        step = current_step.get()
+        statements[step] = statements.get(step, 0) + 1
+
+    request = RecordingRequest()
+    application = build(request)
+    await application.initialize()
+    await app.post_init(application)
+    await application.start()
+
+    latencies = []
+    steps_done = {}
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            run_user(application, user_id, rounds, think, latencies, steps_done)
+            for user_id in range(1, users + 1)
+        )
+    )
+    elapsed = time.perf_counter() - started
+
+    await application.stop()
+    await app.post_stop(application)
+    await application.shutdown()
+    await app.post_shutdown(application)
+
+    # Каждая сессия должна закончиться подтверждением записи
+    saved = sum(1 for _, _, text in request.sent if text and "успешно" in text)
+    return {
+        "updates": len(latencies),
+        "elapsed": elapsed,
+        "latencies": latencies,
+        "statements": statements,
+        "steps": steps_done,
+        "replies": len(request.sent),
+        "saved": saved,
+        "expected_saved": users * rounds * len(SESSIONS),
+    }
+
+
+def percentile(values, share):
+    return values[min(len(values) - 1, int(len(values) * share))] * 1000
+
+
+def report(users, result, verbose):
+    latencies = sorted(latency for _, latency in result["latencies"])
+    updates = result["updates"]
+    total_statements = sum(result["statements"].values())
+    print(
+        f"{users:>4} польз. | {updates / result['elapsed']:7.0f} upd/s | "
+        f"p50 {percentile(latencies, 0.5):6.2f} ms | "
+        f"p95 {percentile(latencies, 0.95):6.2f} ms | "
+        f"p99 {percentile(latencies, 0.99):6.2f} ms | "
+        f"SQL/upd {total_statements / updates:5.2f} | "
+        f"ответов/upd {result['replies'] / updates:4.2f} | "
+        f"записано {result['saved']}/{result['expected_saved']}"
+    )
+
+    if verbose:
+        for step in sorted(result["steps"]):
+            step_latencies = sorted(
+                latency for name, latency in result["latencies"] if name == step
+            )
+            print(
+                f"       {step:<20} p50 {percentile(step_latencies, 0.5):7.2f} ms | "
+                f"p95 {percentile(step_latencies, 0.95):7.2f} ms | SQL/upd "
+                f"{result['statements'].get(step, 0) / result['steps'][step]:5.2f}"
+            )
+        print(f"       фоновых SQL {result['statements'].get('background', 0)}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Нагрузочный прогон сценариев бота без сети и Telegram"
+    )
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--think", type=float, default=0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    for module in (main_menu, mindflow, reflection, reminders, settings):
+        router.register(module.ROUTES, module.STATES)
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        for users in args.users:
+            result = await measure(users, args.rounds, args.think, tmp)
+            report(users, result, args.verbose)
+            failed = failed or result["saved"] != result["expected_saved"]
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    # app.py включает DEBUG для всего, здесь он только мешает читать отчёт
+    logging.getLogger().setLevel(logging.WARNING)
+    raise SystemExit(asyncio.run(main()))
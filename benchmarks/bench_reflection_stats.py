@@ -0,0 +1,110 @@
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import case, func, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import src.database as database
+import src.migrations as migrations
+import src.stats as stats
+import src.user_stats as user_stats
+
+REFLECTIONS_PER_USER = 100
+QUERIES = 20
+
+
+async def prepare(engine, rows):
+    users = max(rows // REFLECTIONS_PER_USER, 1)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(database.Base.metadata.create_all)
+        await conn.run_sync(migrations.upgrade)
+
+        batch = []
+        for i in range(rows):
+            batch.append(
+                {
+                    "id": str(uuid.uuid4()),
+                    "user_id": i % users,
+                    "last_modified": float(i),
+                    "time_spent": random.randrange(3),
+                    "is_interrupt_successfull": random.random() < 0.5,
+                }
+            )
+            if len(batch) == 10_000:
+                await conn.execute(insert(database.Reflection), batch)
+                batch = []
+        if batch:
+            await conn.execute(insert(database.Reflection), batch)
+
+        # Строки вставлены в обход счётчиков, пересобираем user_stats целиком
+        await conn.run_sync(user_stats.rebuild)
+
+    return users
+
+
+async def load_to_df_stats(user_id):
+    df = await database.load_to_df(select(database.Reflection))
+    df = df[df["user_id"] == user_id]
+    return len(df), len(df[df["is_interrupt_successfull"] == True])
+
+
+async def group_by_stats(user_id):
+    # Прежняя агрегация GROUP BY по reflections, для сравнения со счётчиками user_stats
+    async with database.get_session(user_id) as session:
+        result = await session.execute(
+            select(
+                database.Reflection.time_spent,
+                func.count(),
+                func.sum(
+                    case((database.Reflection.is_interrupt_successfull, 1), else_=0)
+                ),
+            )
+            .where(database.Reflection.user_id == user_id)
+            .group_by(database.Reflection.time_spent)
+        )
+        return result.all()
+
+
+async def measure(function, users, queries):
+    timings = []
+    for _ in range(queries):
+        user_id = random.randrange(users)
+        start = time.perf_counter()
+        await function(user_id)
+        timings.append(time.perf_counter() - start)
+
+    return statistics.median(timings) * 1000
+
+
+async def run(rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        database.bind(engine)
+
+        users = await prepare(engine, rows)
+        before = await measure(load_to_df_stats, users, 3 if rows >= 1_000_000 else 5)
+        grouped = await measure(group_by_stats, users, QUERIES)
+        counters = await measure(stats.get_reflection_stats, users, QUERIES)
+
+        await engine.dispose()
+
+    print(
+        f"{rows:>8} rows | load_to_df {before:10.2f} ms | "
+        f"GROUP BY {grouped:8.3f} ms | user_stats {counters:8.3f} ms"
+    )
+
+
+async def main():
+    for rows in (10_000, 100_000, 1_000_000):
+        await run(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
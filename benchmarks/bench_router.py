@@ -0,0 +1,134 @@
+import asyncio
+import datetime as dt
+import json
+import re
+import time
+
+from telegram import Chat, Message, Update, User
+from telegram.ext import ApplicationBuilder, MessageHandler, filters
+from telegram.request import BaseRequest
+
+import src.main_menu as main_menu
+import src.mindflow as mindflow
+import src.reflection as reflection
+import src.reminders as reminders
+import src.router as router
+import src.settings as settings
+
+UPDATES = 20_000
+MODULES = (main_menu, mindflow, reflection, reminders, settings)
+
+
+class StubRequest(BaseRequest):
+    # Bot API не нужен: getMe при initialize отвечаем сами
+    read_timeout = None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        me = {"id": 1, "is_bot": True, "first_name": "bot", "username": "bot"}
+        return 200, json.dumps({"ok": True, "result": me}).encode()
+
+
+async def noop(update, context):
+    pass
+
+
+def make_legacy_handlers():
+    # Как было в app.py: по регулярке на каждую кнопку и цепочка if/elif
+    states = [state for module in MODULES for state in module.STATES]
+
+    async def handle_messages(update, context):
+        user_context = context.user_data.get("context", None)
+        for state in states:
+            if user_context == state:
+                return await noop(update, context)
+        return await noop(update, context)
+
+    handlers = [
+        MessageHandler(filters.Regex(re.compile(f"^{re.escape(text)}$")), noop)
+        for module in MODULES
+        for text in module.ROUTES
+    ]
+    handlers.append(
+        MessageHandler(
+            (filters.TEXT & ~filters.COMMAND) | filters.VOICE, handle_messages
+        )
+    )
+    return handlers
+
+
+def make_router_handlers():
+    for module in MODULES:
+        router.register(
+            {text: noop for text in module.ROUTES},
+            {state: noop for state in module.STATES},
+        )
+
+    return [
+        MessageHandler(
+            (filters.TEXT & ~filters.COMMAND) | filters.VOICE, router.dispatch
+        )
+    ]
+
+
+def make_update(update_id, text):
+    user = User(id=1, first_name="user", is_bot=False)
+    message = Message(
+        message_id=update_id,
+        date=dt.datetime.now(dt.timezone.utc),
+        chat=Chat(id=1, type="private"),
+        from_user=user,
+        text=text,
+    )
+    return Update(update_id=update_id, message=message)
+
+
+async def measure(handlers, texts):
+    application = (
+        ApplicationBuilder()
+        .token("0:benchmark")
+        .request(StubRequest())
+        .get_updates_request(StubRequest())
+        .build()
+    )
+    await application.initialize()
+    for handler in handlers:
+        application.add_handler(handler)
+    application.user_data[1]["context"] = "ENTERING_SALUTE_SPEECH_TOKEN"
+
+    updates = [make_update(i, texts[i % len(texts)]) for i in range(UPDATES)]
+
+    start = time.perf_counter()
+    for update in updates:
+        await application.process_update(update)
+    elapsed = time.perf_counter() - start
+
+    await application.shutdown()
+    return elapsed / UPDATES * 1_000_000
+
+
+async def main():
+    legacy = make_legacy_handlers()
+    routed = make_router_handlers()
+
+    cases = {
+        "первая кнопка": ["В главное меню 🫆"],
+        "последняя кнопка": ["SaluteSpeech 🎉"],
+        "ввод в состоянии": ["просто текст"],
+    }
+    for name, texts in cases.items():
+        before = await measure(legacy, texts)
+        after = await measure(routed, texts)
+        print(
+            f"{name:<18} | regex + if/elif {before:6.1f} us | "
+            f"роутер {after:6.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
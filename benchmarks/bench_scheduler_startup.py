@@ -0,0 +1,72 @@
+import asyncio
+import os
+import resource
+import sys
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import src.database as database
+import src.migrations as migrations
+import src.scheduler as scheduler
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+USERS = 10_000
+
+
+async def prepare(engine, rows):
+    now = time.time()
+
+    async with engine.begin() as conn:
+        await conn.run_sync(database.Base.metadata.create_all)
+        await conn.run_sync(migrations.upgrade)
+
+        batch = []
+        for i in range(rows):
+            batch.append(
+                {
+                    "id": str(uuid.uuid4()),
+                    "user_id": i % USERS,
+                    "chat_id": i % USERS,
+                    "last_modified": now,
+                    "scheduled_at": now + (i * 7919) % (3 * 24 * 60 * 60),
+                    "header": "напоминание",
+                }
+            )
+            if len(batch) == 10_000:
+                await conn.execute(insert(database.Reminder), batch)
+                batch = []
+        if batch:
+            await conn.execute(insert(database.Reminder), batch)
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        database.bind(engine)
+
+        await prepare(engine, ROWS)
+        rss_before = max_rss_mb()
+
+        start = time.perf_counter()
+        await scheduler.load()
+        elapsed = time.perf_counter() - start
+
+        print(
+            f"{len(scheduler.queue)} reminders loaded in {elapsed:.2f} s, "
+            f"max RSS {rss_before:.0f} -> {max_rss_mb():.0f} MB"
+        )
+
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,53 @@
+import asyncio
+import os
+import tempfile
+import time
+
+import src.database as database
+import src.writer as writer
+
+INSERTS = 4_000
+USERS = 16
+SHARDS = (1, 2, 4, 8)
+
+
+async def produce(users):
+    for i in range(INSERTS // USERS):
+        for user_id in users:
+            await writer.add(
+                database.Mindflow(user_id=user_id, last_modified=i, notes="мысль")
+            )
+
+
+async def measure(tmp, shards):
+    path = os.path.join(tmp, f"bench_{shards}.db")
+    database.bind(
+        *(
+            database.make_engine(database.get_url("sqlite", path, shard))
+            for shard in range(shards)
+        )
+    )
+    await database.init()
+
+    # Каждый пользователь пишет по одной записи за раз, как в боте
+    start = time.perf_counter()
+    await asyncio.gather(*(produce([user_id]) for user_id in range(USERS)))
+    elapsed = time.perf_counter() - start
+
+    for engine in database.engines:
+        await engine.dispose()
+
+    return INSERTS / elapsed
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = None
+        for shards in SHARDS:
+            rate = await measure(tmp, shards)
+            baseline = baseline or rate
+            print(f"{shards:>2} shards | {rate:8.0f} ins/s | x{rate / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
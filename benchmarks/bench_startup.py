@@ -0,0 +1,119 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RUNS = 5
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "startup_baseline.json")
+# Допуск на шум: медиана из RUNS запусков может гулять на десяток процентов
+TOLERANCE = 1.25
+# Эти пакеты должны грузиться только при первом использовании
+LAZY_MODULES = ("pandas", "salute_speech", "pydub")
+
+# Запускается в отдельном процессе, чтобы мерить холодный старт с нуля
+CHILD = """
+import time
+import asyncio
+import json
+import os
+import resource
+import sys
+import types
+
+import app
+
+imported_at = time.time()
+
+
+async def main():
+    application = types.SimpleNamespace(bot=None)
+    await app.post_init(application)
+    ready_at = time.time()
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    await app.post_stop(application)
+    await app.post_shutdown(application)
+    return ready_at, rss
+
+
+ready_at, rss = asyncio.run(main())
+started_at = float(os.environ["BENCH_STARTED_AT"])
+print(json.dumps({
+    "import": imported_at - started_at,
+    "post_init": ready_at - started_at,
+    "rss": rss,
+    "lazy_loaded": [name for name in %r if name in sys.modules],
+}))
+""" % (
+    LAZY_MODULES,
+)
+
+
+def run_once(tmp, run):
+    env = {
+        **os.environ,
+        "API_TOKEN": "0:bench",
+        "DATABASE_PATH": os.path.join(tmp, f"{run}.db"),
+        "BENCH_STARTED_AT": repr(time.time()),
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def measure():
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = [run_once(tmp, run) for run in range(RUNS)]
+
+    return {
+        "import": statistics.median(run["import"] for run in runs),
+        "post_init": statistics.median(run["post_init"] for run in runs),
+        "rss": statistics.median(run["rss"] for run in runs),
+        "lazy_loaded": sorted({name for run in runs for name in run["lazy_loaded"]}),
+    }
+
+
+def main():
+    current = measure()
+    print(
+        f"импорт {current['import'] * 1000:6.0f} ms | "
+        f"до post_init {current['post_init'] * 1000:6.0f} ms | "
+        f"RSS {current['rss']:5.1f} MB"
+    )
+
+    if "--save" in sys.argv:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(current, f, indent=4)
+        print(f"Базовые значения сохранены в {BASELINE_PATH}")
+        return 0
+
+    failures = [f"на старте загружен {name}" for name in current["lazy_loaded"]]
+
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+
+        for key in ("import", "post_init", "rss"):
+            if current[key] > baseline[key] * TOLERANCE:
+                failures.append(
+                    f"{key}: {current[key]:.3f} против {baseline[key]:.3f} в базе"
+                )
+    else:
+        print("Базовых значений нет, сохраните их через --save")
+
+    for failure in failures:
+        print(f"Регрессия: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
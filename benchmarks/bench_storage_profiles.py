@@ -0,0 +1,79 @@
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+import src.database as database
+import src.migrations as migrations
+import src.paginator as paginator
+import src.writer as writer
+
+PROFILES = (None, "durable", "throughput")
+INSERTS = 2_000
+PRODUCERS = 50
+USERS = 200
+WINDOWS = 500
+
+
+async def insert_workload():
+    async def produce(producer):
+        for i in range(INSERTS // PRODUCERS):
+            await writer.add(
+                database.Mindflow(
+                    user_id=(producer * 31 + i) % USERS,
+                    last_modified=time.time(),
+                    notes="мысль",
+                )
+            )
+
+    start = time.perf_counter()
+    await produce(0)
+    sequential = (INSERTS // PRODUCERS) / (time.perf_counter() - start)
+
+    writer.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(produce(producer) for producer in range(PRODUCERS)))
+    concurrent = INSERTS / (time.perf_counter() - start)
+    await writer.stop()
+
+    return sequential, concurrent
+
+
+async def navigation_workload():
+    start = time.perf_counter()
+    for _ in range(WINDOWS):
+        paginator.invalidate(database.Mindflow)
+        await paginator.load(database.Mindflow, random.randrange(USERS))
+    return WINDOWS / (time.perf_counter() - start)
+
+
+async def run(profile):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = database.make_engine(
+            f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}", profile
+        )
+        database.bind(engine)
+
+        async with engine.begin() as conn:
+            await conn.run_sync(database.Base.metadata.create_all)
+            await conn.run_sync(migrations.upgrade)
+
+        sequential, concurrent = await insert_workload()
+        navigation = await navigation_workload()
+
+        await engine.dispose()
+
+    print(
+        f"{profile or 'без PRAGMA':>12} | вставка по одной {sequential:7.0f} ins/s | "
+        f"group commit {concurrent:7.0f} ins/s | окна навигации {navigation:7.0f} /s"
+    )
+
+
+async def main():
+    for profile in PROFILES:
+        await run(profile)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,139 @@
+import asyncio
+import os
+import statistics
+import time
+import uuid
+from types import SimpleNamespace
+
+import aiofiles.os as aios
+
+import src.database as database
+import src.speech_clients as speech_clients
+import src.tts as tts
+
+MESSAGES = 50
+AUTH_ROUND_TRIP = 0.05
+SIZES = (32 * 1024, 1024 * 1024, 16 * 1024 * 1024)
+
+
+class File:
+    def __init__(self, payload):
+        self.payload = payload
+
+    async def download_to_drive(self, path):
+        with open(path, "wb") as file:
+            file.write(self.payload)
+
+    async def download_to_memory(self, out):
+        out.write(self.payload)
+
+
+class TokenManager:
+    def __init__(self):
+        self.token_expiry = None
+
+    def get_valid_token(self):
+        if self.token_expiry is None or self.token_expiry < time.time() * 1000:
+            time.sleep(AUTH_ROUND_TRIP)
+            self.token_expiry = (time.time() + 30 * 60) * 1000
+        return "access token"
+
+
+class Transcriptions:
+    def __init__(self, token_manager):
+        self.token_manager = token_manager
+
+    async def create(self, file, language):
+        await asyncio.to_thread(self.token_manager.get_valid_token)
+
+        # requests отправляет тело запроса кусками по 8 КиБ
+        while file.read(8192):
+            pass
+        return SimpleNamespace(text="распознанный текст")
+
+
+# Клиент заглушен: настоящий transcriptions.create ещё и пишет клип во временный
+# файл (AudioValidator._detect_params), этой записи бенчмарк не видит
+class Client:
+    def __init__(self, client_credentials):
+        self.token_manager = TokenManager()
+        self.audio = SimpleNamespace(transcriptions=Transcriptions(self.token_manager))
+
+
+def make_update(payload, file_unique_id):
+    async def reply_text(text):
+        pass
+
+    async def get_file(file_id):
+        return File(payload)
+
+    voice = SimpleNamespace(
+        file_id="voice", file_unique_id=file_unique_id, file_size=len(payload)
+    )
+    message = SimpleNamespace(text=None, voice=voice, reply_text=reply_text)
+    context = SimpleNamespace(bot=SimpleNamespace(get_file=get_file))
+    return SimpleNamespace(message=message), context
+
+
+async def ensure_text_message_on_disk(update, context):
+    # Прежний путь: новый клиент с OAuth-обменом, файл на диске,
+    # блокирующее чтение и удаление
+    file_id = update.message.voice.file_id
+    voice_file = await context.bot.get_file(file_id)
+    file_path = f"data/{file_id}.oga"
+    try:
+        client = Client(client_credentials="token")
+        await voice_file.download_to_drive(file_path)
+        with open(file_path, "rb") as audio_file:
+            result = await client.audio.transcriptions.create(
+                file=audio_file, language="ru-RU"
+            )
+    finally:
+        await aios.remove(file_path)
+    return result.text
+
+
+async def measure(handler, payload, repeated=False):
+    latencies = []
+    for _ in range(MESSAGES):
+        update, context = make_update(
+            payload, "repeated" if repeated else str(uuid.uuid4())
+        )
+        start = time.perf_counter()
+        await handler(update, context)
+        latencies.append(time.perf_counter() - start)
+
+    return statistics.median(latencies) * 1000, max(latencies) * 1000
+
+
+async def get_api_token(update, context):
+    return "token"
+
+
+async def main():
+    speech_clients.setup()
+    speech_clients.SaluteSpeechClient = Client
+    tts.get_api_token = get_api_token
+    os.makedirs("data", exist_ok=True)
+
+    engine = database.make_engine("sqlite+aiosqlite:///:memory:")
+    database.bind(engine)
+    await database.init()
+
+    for size in SIZES:
+        old_p50, old_max = await measure(ensure_text_message_on_disk, bytes(size))
+        new_p50, new_max = await measure(tts.ensure_text_message, bytes(size))
+        hit_p50, hit_max = await measure(
+            tts.ensure_text_message, bytes(size), repeated=True
+        )
+        print(
+            f"{size // 1024:>6} KiB | было p50 {old_p50:7.2f} ms max {old_max:7.2f} | "
+            f"стало p50 {new_p50:7.2f} ms max {new_max:7.2f} | "
+            f"повтор p50 {hit_p50:5.2f} ms"
+        )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
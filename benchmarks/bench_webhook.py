@@ -0,0 +1,171 @@
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from tornado.web import Application, RequestHandler
+
+UPDATES = 300
+RATE = 50
+WEBHOOK_SECRET = "bench"
+
+state = {"updates": asyncio.Queue, "sent_at": {}, "latencies": [], "ready": None}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class BotApi(RequestHandler):
+    # Поддельный Bot API: отдаёт апдейты в getUpdates и засекает ответы бота
+    async def post(self, token, method):
+        if method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "bot", "username": "bot"}
+        elif method == "getUpdates":
+            result = await self.get_updates()
+        elif method == "sendMessage":
+            result = self.send_message()
+        else:
+            result = True
+
+        if method in ("getMe", "setWebhook", "getUpdates"):
+            state["ready"].set()
+        self.write({"ok": True, "result": result})
+
+    async def get_updates(self):
+        queue = state["updates"]
+        timeout = float(self.get_body_argument("timeout", "0"))
+        try:
+            update = await asyncio.wait_for(queue.get(), timeout or 0.001)
+        except asyncio.TimeoutError:
+            return []
+
+        updates = [update]
+        while not queue.empty():
+            updates.append(queue.get_nowait())
+        return updates
+
+    def send_message(self):
+        chat_id = int(self.get_body_argument("chat_id"))
+        sent_at = state["sent_at"].pop(chat_id, None)
+        if sent_at:
+            state["latencies"].append(time.perf_counter() - sent_at)
+
+        return {
+            "message_id": 1,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": self.get_body_argument("text"),
+        }
+
+
+def make_update(update_id):
+    user = {"id": update_id, "is_bot": False, "first_name": "user"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": update_id, "type": "private"},
+            "from": user,
+            "text": "В главное меню 🫆",
+        },
+    }
+
+
+async def deliver(client, mode, webhook_url, update):
+    state["sent_at"][update["update_id"]] = time.perf_counter()
+    if mode == "polling":
+        await state["updates"].put(update)
+        return
+
+    for _ in range(50):
+        try:
+            await client.post(
+                webhook_url,
+                json=update,
+                headers={"X-Telegram-Bot-Api-Secret-Token": WEBHOOK_SECRET},
+            )
+            return
+        except httpx.ConnectError:
+            await asyncio.sleep(0.1)
+
+
+async def measure(mode, api_port, tmp):
+    state["updates"] = asyncio.Queue()
+    state["sent_at"].clear()
+    state["latencies"] = []
+    state["ready"] = asyncio.Event()
+
+    webhook_port = free_port()
+    webhook_url = f"http://127.0.0.1:{webhook_port}/telegram"
+    env = {
+        **os.environ,
+        "API_TOKEN": "0:bench",
+        "BOT_MODE": mode,
+        "BOT_API_BASE_URL": f"http://127.0.0.1:{api_port}/bot",
+        "WEBHOOK_LISTEN": "127.0.0.1",
+        "WEBHOOK_PORT": str(webhook_port),
+        "WEBHOOK_URL": webhook_url,
+        "WEBHOOK_SECRET": WEBHOOK_SECRET,
+        "DATABASE_PATH": os.path.join(tmp, f"{mode}.db"),
+    }
+    bot = subprocess.Popen(
+        [sys.executable, "app.py"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    try:
+        await asyncio.wait_for(state["ready"].wait(), 30)
+        await asyncio.sleep(1)
+
+        async with httpx.AsyncClient() as client:
+            for update_id in range(1, UPDATES + 1):
+                await deliver(client, mode, webhook_url, make_update(update_id))
+                await asyncio.sleep(1 / RATE)
+
+        deadline = time.perf_counter() + 30
+        while state["sent_at"] and time.perf_counter() < deadline:
+            await asyncio.sleep(0.1)
+
+    finally:
+        # Бот при остановке ещё ходит в поддельный API, цикл блокировать нельзя
+        bot.terminate()
+        await asyncio.to_thread(bot.wait)
+
+    latencies = sorted(state["latencies"])
+    return (
+        statistics.median(latencies) * 1000,
+        latencies[int(len(latencies) * 0.99)] * 1000,
+        len(latencies),
+    )
+
+
+async def main():
+    api_port = free_port()
+    server = Application([(r"/bot([^/]+)/(\w+)", BotApi)]).listen(api_port, "127.0.0.1")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("polling", "webhook"):
+            p50, p99, replies = await measure(mode, api_port, tmp)
+            print(
+                f"{mode:<8} | p50 {p50:6.1f} ms | p99 {p99:6.1f} ms | "
+                f"{replies}/{UPDATES} ответов"
+            )
+
+    server.stop()
+    await server.close_all_connections()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import src.database as database
+import src.migrations as migrations
+import src.writer as writer
+
+INSERTS = 2_000
+CONCURRENCY = (1, 10, 100)
+
+
+async def produce(count, offset):
+    for i in range(count):
+        await writer.add(
+            database.Mindflow(user_id=offset + i % 50, last_modified=i, notes="мысль")
+        )
+
+
+async def measure(concurrency, group_commit):
+    if group_commit:
+        writer.start()
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(produce(INSERTS // concurrency, n * 50) for n in range(concurrency))
+    )
+    elapsed = time.perf_counter() - start
+
+    if group_commit:
+        await writer.stop()
+
+    return INSERTS / elapsed
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        database.bind(engine)
+
+        async with engine.begin() as conn:
+            await conn.run_sync(database.Base.metadata.create_all)
+            await conn.run_sync(migrations.upgrade)
+
+        for concurrency in CONCURRENCY:
+            direct = await measure(concurrency, group_commit=False)
+            batched = await measure(concurrency, group_commit=True)
+            print(
+                f"{concurrency:>4} producers | по одной {direct:8.0f} ins/s | "
+                f"group commit {batched:8.0f} ins/s"
+            )
+
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+import asyncio
+import os
+import random
+import time
+
+import src.speech_clients as speech_clients
+
+ASR_PROVIDER = os.getenv("ASR_PROVIDER", "salute_speech")
+FAKE_LATENCY = float(os.getenv("ASR_FAKE_LATENCY", 1.0))
+FAKE_JITTER = float(os.getenv("ASR_FAKE_JITTER", 0.2))
+FAKE_ERROR_RATE = float(os.getenv("ASR_FAKE_ERROR_RATE", 0))
+FAKE_CONCURRENCY = int(os.getenv("ASR_FAKE_CONCURRENCY", 10))
+FAKE_RATE = float(os.getenv("ASR_FAKE_RATE", 0))
+
+
+class SaluteSpeechProvider:
+    async def transcribe(self, credentials, audio_file, language):
+        client = await speech_clients.get_client(credentials)
+        result = await client.audio.transcriptions.create(
+            file=audio_file, language=language
+        )
+        return result.text
+
+
+class FakeProvider:
+    # Локальная замена распознаванию для нагрузочных тестов без сети
+    def __init__(
+        self,
+        latency=FAKE_LATENCY,
+        jitter=FAKE_JITTER,
+        error_rate=FAKE_ERROR_RATE,
+        concurrency=FAKE_CONCURRENCY,
+        rate=FAKE_RATE,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.interval = 1 / rate if rate else 0
+        self.next_start = 0.0
+
+    async def throttle(self):
+        now = time.monotonic()
+        start = max(now, self.next_start)
+        self.next_start = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def transcribe(self, credentials, audio_file, language):
+        async with self.semaphore:
+            await self.throttle()
+
+            size = 0
+            while chunk := audio_file.read(8192):
+                size += len(chunk)
+
+            await asyncio.sleep(
+                max(0, self.latency + random.uniform(-self.jitter, self.jitter))
+            )
+            if random.random() < self.error_rate:
+                raise RuntimeError("Сбой распознавания (fake)")
+
+            return f"Голосовое на {size} байт"
+
+
+PROVIDERS = {
+    "salute_speech": SaluteSpeechProvider,
+    "fake": FakeProvider,
+}
+
+provider = PROVIDERS[ASR_PROVIDER]()
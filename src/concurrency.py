@@ -0,0 +1,113 @@
+import asyncio
+import os
+import time
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", 32))
+UPDATE_QUEUE_SIZE = int(os.getenv("UPDATE_QUEUE_SIZE", 1024))
+
+# Очередь каждого пользователя: его апдейты идут строго по одному и по порядку,
+# запись живёт, пока у пользователя есть хотя бы один апдейт в работе
+users = {}
+metrics = {
+    "processed": 0,
+    "queued": 0,
+    "max_queued": 0,
+    "running": 0,
+    "total_wait": 0.0,
+    "max_wait": 0.0,
+}
+
+
+def get_key(update):
+    if not isinstance(update, Update):
+        return None
+    if update.effective_user:
+        return update.effective_user.id
+    if update.effective_chat:
+        return update.effective_chat.id
+    return None
+
+
+def record_wait(user, wait):
+    user["last_wait"] = wait
+    metrics["total_wait"] += wait
+    metrics["max_wait"] = max(metrics["max_wait"], wait)
+
+
+def get_user_metrics():
+    now = time.perf_counter()
+    return {
+        key: {
+            "depth": user["depth"],
+            "oldest_wait": now - user["waiting"][0] if user["waiting"] else 0.0,
+            "last_wait": user["last_wait"],
+        }
+        for key, user in users.items()
+    }
+
+
+class UserUpdateProcessor(BaseUpdateProcessor):
+    # Семафор PTB охватывает и ожидание в очереди пользователя, поэтому он
+    # ограничивает только число принятых апдейтов, а параллельность - workers
+    def __init__(self, workers=UPDATE_WORKERS, queue_size=UPDATE_QUEUE_SIZE):
+        super().__init__(queue_size)
+        self.workers = asyncio.Semaphore(workers)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def run(self, coroutine):
+        metrics["running"] += 1
+        try:
+            await coroutine
+        finally:
+            metrics["running"] -= 1
+            metrics["processed"] += 1
+
+    async def do_process_update(self, update, coroutine):
+        key = get_key(update)
+        if key is None:
+            async with self.workers:
+                return await self.run(coroutine)
+
+        user = users.get(key)
+        if user is None:
+            user = users[key] = {
+                "lock": asyncio.Lock(),
+                "depth": 0,
+                "waiting": [],
+                "last_wait": None,
+            }
+
+        queued_at = time.perf_counter()
+        user["depth"] += 1
+        user["waiting"].append(queued_at)
+        metrics["queued"] += 1
+        metrics["max_queued"] = max(metrics["max_queued"], metrics["queued"])
+
+        started = False
+        try:
+            # asyncio.Lock будит ожидающих по порядку, а задачи создаются в
+            # порядке прихода апдейтов, так что порядок пользователя сохраняется
+            async with user["lock"], self.workers:
+                user["waiting"].remove(queued_at)
+                metrics["queued"] -= 1
+                started = True
+                record_wait(user, time.perf_counter() - queued_at)
+                await self.run(coroutine)
+
+        finally:
+            if not started:
+                user["waiting"].remove(queued_at)
+                metrics["queued"] -= 1
+                coroutine.close()
+
+            user["depth"] -= 1
+            if not user["depth"]:
+                del users[key]
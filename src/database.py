@@ -1,20 +1,33 @@
+import asyncio
+import os
 import uuid
 from contextlib import asynccontextmanager
 
-import pandas as pd
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Column,
     Double,
+    Index,
     Integer,
+    LargeBinary,
     String,
     create_engine,
     delete,
+    event,
     select,
     update,
 )
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import StaticPool
+
+import src.migrations as migrations
+
+# Telegram id не влезают в 32 бита; в SQLite INTEGER и так 64-битный
+TelegramId = BigInteger().with_variant(Integer, "sqlite")
 
 
 class Base(DeclarativeBase):
@@ -23,7 +36,10 @@ class Base(DeclarativeBase):
 
 class Mindflow(Base):
     __tablename__ = "mindflows"
-    user_id = Column(Integer, nullable=False)
+    __table_args__ = (
+        Index("ix_mindflows_user_id_last_modified", "user_id", "last_modified"),
+    )
+    user_id = Column(TelegramId, nullable=False)
     id = Column(
         String, nullable=False, primary_key=True, default=lambda: str(uuid.uuid4())
     )
@@ -33,7 +49,16 @@ class Mindflow(Base):
 
 class Reflection(Base):
     __tablename__ = "reflections"
-    user_id = Column(Integer, nullable=False)
+    __table_args__ = (
+        Index("ix_reflections_user_id_last_modified", "user_id", "last_modified"),
+        Index(
+            "ix_reflections_user_id_time_spent",
+            "user_id",
+            "time_spent",
+            "is_interrupt_successfull",
+        ),
+    )
+    user_id = Column(TelegramId, nullable=False)
     id = Column(
         String, nullable=False, primary_key=True, default=lambda: str(uuid.uuid4())
     )
@@ -45,11 +70,15 @@ class Reflection(Base):
 
 class Reminder(Base):
     __tablename__ = "reminders"
-    user_id = Column(Integer, nullable=False)
+    __table_args__ = (
+        Index("ix_reminders_user_id_last_modified", "user_id", "last_modified"),
+        Index("ix_reminders_scheduled_at", "scheduled_at"),
+    )
+    user_id = Column(TelegramId, nullable=False)
     id = Column(
         String, nullable=False, primary_key=True, default=lambda: str(uuid.uuid4())
     )
-    chat_id = Column(Integer, nullable=False)
+    chat_id = Column(TelegramId, nullable=False)
     last_modified = Column(Double, nullable=False)
     scheduled_at = Column(Double, nullable=False)
     header = Column(String, default=lambda: None)
@@ -57,37 +86,207 @@ class Reminder(Base):
 
 class Setting(Base):
     __tablename__ = "settings"
-    user_id = Column(Integer, nullable=False)
+    __table_args__ = (Index("ux_settings_user_id", "user_id", unique=True),)
+    user_id = Column(TelegramId, nullable=False)
     id = Column(
         String, nullable=False, primary_key=True, default=lambda: str(uuid.uuid4())
     )
     salute_speech = Column(String, nullable=False)
 
 
-engine = create_async_engine(
-    "sqlite+aiosqlite:///data/user_data.db",
-    echo=True,
-    future=True,
-    pool_pre_ping=True,
-)
+class UserStat(Base):
+    __tablename__ = "user_stats"
+    user_id = Column(TelegramId, nullable=False, primary_key=True)
+    mindflows = Column(Integer, nullable=False, default=0, server_default="0")
+    reflections = Column(Integer, nullable=False, default=0, server_default="0")
+    reflections_successful = Column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    reflections_time_spent_0 = Column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    reflections_time_spent_1 = Column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    reflections_time_spent_2 = Column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    reminders = Column(Integer, nullable=False, default=0, server_default="0")
 
-AsyncSessionLocal = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
-)
 
+class UserData(Base):
+    __tablename__ = "user_data"
+    user_id = Column(TelegramId, nullable=False, primary_key=True)
+    updated_at = Column(Double, nullable=False)
+    data = Column(LargeBinary, nullable=False)
 
-async def init():
-    async with engine.begin() as conn:
+
+class Transcription(Base):
+    __tablename__ = "transcriptions"
+    __table_args__ = (Index("ix_transcriptions_created_at", "created_at"),)
+    file_unique_id = Column(String, nullable=False, primary_key=True)
+    language = Column(String, nullable=False, primary_key=True)
+    created_at = Column(Double, nullable=False)
+    text = Column(String, nullable=False)
+
+
+PROFILES = {
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -64 * 1024,
+        "mmap_size": 0,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    "throughput": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -256 * 1024,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+}
+
+DATABASE_URL = os.getenv("DATABASE_URL", None)
+DATABASE_BACKEND = os.getenv("DATABASE_BACKEND", "sqlite")
+DATABASE_PATH = os.getenv("DATABASE_PATH", "data/user_data.db")
+DATABASE_SHARDS = int(os.getenv("DATABASE_SHARDS", 1))
+DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "durable")
+DATABASE_ECHO = os.getenv("DATABASE_ECHO", "0") == "1"
+DATABASE_POOL_PRE_PING = os.getenv("DATABASE_POOL_PRE_PING", "0") == "1"
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", 5))
+DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", 10))
+DATABASE_POOL_TIMEOUT = float(os.getenv("DATABASE_POOL_TIMEOUT", 10))
+DATABASE_POOL_RECYCLE = int(os.getenv("DATABASE_POOL_RECYCLE", 30 * 60))
+
+
+def get_shard_path(shard, path=DATABASE_PATH):
+    # Нулевой шард - это исходный файл, чтобы один шард совпадал со старой базой
+    if shard == 0:
+        return path
+
+    root, ext = os.path.splitext(path)
+    return f"{root}.{shard}{ext}"
+
+
+def get_url(backend=DATABASE_BACKEND, path=DATABASE_PATH, shard=0):
+    if DATABASE_URL:
+        return DATABASE_URL.format(shard=shard)
+
+    if backend == "sqlite":
+        return f"sqlite+aiosqlite:///{get_shard_path(shard, path)}"
+    elif backend == "memory":
+        return "sqlite+aiosqlite:///:memory:"
+
+    raise ValueError(f"Для бэкенда {backend} нужно задать DATABASE_URL")
+
+
+def apply_profile(engine, profile):
+    pragmas = PROFILES[profile]
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+
+def make_engine(url=None, profile=DATABASE_PROFILE, echo=DATABASE_ECHO):
+    url = make_url(url or get_url())
+    options = {"echo": echo, "future": True, "pool_pre_ping": DATABASE_POOL_PRE_PING}
+
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # Одно общее соединение, иначе каждая сессия увидит свою пустую базу
+        options["poolclass"] = StaticPool
+    else:
+        options["pool_size"] = DATABASE_POOL_SIZE
+        options["max_overflow"] = DATABASE_MAX_OVERFLOW
+        options["pool_timeout"] = DATABASE_POOL_TIMEOUT
+
+    if url.get_backend_name() == "postgresql":
+        options["pool_recycle"] = DATABASE_POOL_RECYCLE
+        options["connect_args"] = {
+            "command_timeout": 30,
+            "server_settings": {"application_name": "adhd_diary_bot", "jit": "off"},
+        }
+
+    engine = create_async_engine(url, **options)
+    if profile and url.get_backend_name() == "sqlite":
+        apply_profile(engine, profile)
+    return engine
+
+
+def make_session_factory(engine):
+    return async_sessionmaker(
+        engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+    )
+
+
+engines = [make_engine(get_url(shard=shard)) for shard in range(DATABASE_SHARDS)]
+session_factories = [make_session_factory(engine) for engine in engines]
+
+engine = engines[0]
+AsyncSessionLocal = session_factories[0]
+
+
+def bind(*new_engines):
+    global engine, AsyncSessionLocal
+
+    engines[:] = new_engines
+    session_factories[:] = [make_session_factory(engine) for engine in new_engines]
+
+    engine = engines[0]
+    AsyncSessionLocal = session_factories[0]
+
+
+def get_shard(user_id):
+    return user_id % len(engines)
+
+
+async def fan_out(function):
+    return await asyncio.gather(*(function(shard) for shard in range(len(engines))))
+
+
+def insert(model):
+    if engine.dialect.name == "postgresql":
+        # Диалект PostgreSQL нужен только на нём, в SQLite-развёртывании не грузим
+        from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+
+        return postgresql_insert(model)
+    return sqlite_insert(model)
+
+
+def upsert(model, values, index_elements, update_columns):
+    statement = insert(model).values(**values)
+    return statement.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={column: statement.excluded[column] for column in update_columns},
+    )
+
+
+async def init_shard(shard):
+    async with engines[shard].begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(migrations.upgrade)
+
+
+async def init():
+    await fan_out(init_shard)
 
 
 @asynccontextmanager
-async def get_session():
-    async with AsyncSessionLocal() as session:
+async def get_session(user_id=None, shard=None):
+    if shard is None:
+        shard = 0 if user_id is None else get_shard(user_id)
+
+    async with session_factories[shard]() as session:
         try:
             yield session
             await session.commit()
@@ -99,6 +298,9 @@ async def get_session():
 
 
 async def load_to_df(query):
+    # pandas нужен только здесь, а его импорт - самая тяжёлая часть старта
+    import pandas as pd
+
     async with get_session() as session:
         result = await session.execute(query)
         result = result.scalars().all()
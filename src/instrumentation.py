@@ -0,0 +1,207 @@
+import bisect
+import functools
+import io
+import os
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from telegram.request import HTTPXRequest
+from tornado.web import Application, RequestHandler
+
+import src.database as database
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+METRICS_LISTEN = os.getenv("METRICS_LISTEN", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+METRICS_ADMINS = {
+    int(user_id) for user_id in os.getenv("METRICS_ADMINS", "").split(",") if user_id
+}
+
+PREFIX = "adhd_diary_bot"
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# (метрика, метки) -> гистограмма; метки - отсортированный кортеж пар
+histograms = {}
+# Счётчики модулей (writer.metrics и т.п.) отдаём как есть
+sources = {}
+# Источник -> (имя метки, функция {значение метки: {метрика: число}}),
+# опрашивается при каждой выдаче, например очереди активных пользователей
+labelled_sources = {}
+state = {"server": None}
+
+# Обработчик, внутри которого сейчас выполняется код: к нему относим SQL-запросы
+current = ContextVar("handler", default=None)
+
+
+def observe(name, value, buckets=BUCKETS, **labels):
+    if not METRICS_ENABLED:
+        return
+
+    key = (name, tuple(sorted(labels.items())))
+    histogram = histograms.get(key)
+    if histogram is None:
+        histogram = histograms[key] = {
+            "buckets": buckets,
+            "counts": [0] * (len(buckets) + 1),
+            "sum": 0.0,
+            "count": 0,
+        }
+
+    histogram["counts"][bisect.bisect_left(buckets, value)] += 1
+    histogram["sum"] += value
+    histogram["count"] += 1
+
+
+def register(name, metrics):
+    sources[name] = metrics
+
+
+def register_labelled(name, label, function):
+    labelled_sources[name] = (label, function)
+
+
+def instrument(function):
+    # Без метрик обработчик не оборачиваем вовсе, чтобы не платить за вызов
+    if not METRICS_ENABLED:
+        return function
+
+    @functools.wraps(function)
+    async def wrapper(update, context):
+        handler = {"name": function.__name__, "queries": 0}
+        token = current.set(handler)
+        started = time.perf_counter()
+        try:
+            return await function(update, context)
+
+        finally:
+            current.reset(token)
+            observe(
+                "handler_seconds",
+                time.perf_counter() - started,
+                handler=handler["name"],
+            )
+            observe(
+                "handler_db_queries",
+                handler["queries"],
+                QUERY_BUCKETS,
+                handler=handler["name"],
+            )
+
+    return wrapper
+
+
+def instrument_all(handlers):
+    return {key: instrument(function) for key, function in handlers.items()}
+
+
+class InstrumentedRequest(HTTPXRequest):
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().do_request(url, method, request_data, **kwargs)
+
+        finally:
+            observe(
+                "telegram_request_seconds",
+                time.perf_counter() - started,
+                method=url.rsplit("/", 1)[-1],
+            )
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.query_started = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context.query_started
+
+    handler = current.get()
+    if handler is None:
+        name = "background"
+    else:
+        name = handler["name"]
+        handler["queries"] += 1
+
+    observe("db_query_seconds", duration, handler=name)
+
+
+def format_labels(labels, **extra):
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+def render():
+    lines = []
+
+    typed = set()
+    for (name, labels), histogram in sorted(histograms.items()):
+        metric = f"{PREFIX}_{name}"
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} histogram")
+            typed.add(metric)
+
+        total = 0
+        for bound, count in zip(histogram["buckets"], histogram["counts"]):
+            total += count
+            lines.append(f"{metric}_bucket{format_labels(labels, le=bound)} {total}")
+        lines.append(
+            f"{metric}_bucket{format_labels(labels, le='+Inf')} {histogram['count']}"
+        )
+        lines.append(f"{metric}_sum{format_labels(labels)} {histogram['sum']}")
+        lines.append(f"{metric}_count{format_labels(labels)} {histogram['count']}")
+
+    for source, metrics in sorted(sources.items()):
+        for key, value in sorted(metrics.items()):
+            if isinstance(value, (int, float)):
+                lines.append(f"{PREFIX}_{source}_{key} {value}")
+
+    for source, (label, function) in sorted(labelled_sources.items()):
+        for label_value, metrics in sorted(function().items()):
+            labels = ((label, label_value),)
+            for key, value in sorted(metrics.items()):
+                if isinstance(value, (int, float)):
+                    lines.append(
+                        f"{PREFIX}_{source}_{key}{format_labels(labels)} {value}"
+                    )
+
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(RequestHandler):
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4")
+        self.write(render())
+
+
+async def handle_metrics(update, context):
+    if update.effective_user.id not in METRICS_ADMINS:
+        return
+
+    await update.message.reply_document(
+        io.BytesIO(render().encode()), filename="metrics.txt"
+    )
+
+
+def start():
+    if not METRICS_ENABLED:
+        return
+
+    for engine in database.engines:
+        event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+
+    if METRICS_PORT:
+        state["server"] = Application([(r"/metrics", MetricsHandler)]).listen(
+            METRICS_PORT, METRICS_LISTEN
+        )
+
+
+def stop():
+    server = state["server"]
+    if server:
+        server.stop()
+        state["server"] = None
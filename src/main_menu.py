@@ -11,11 +11,12 @@ from telegram.ext import (
 )
 
 import src.database as database
+import src.paginator as paginator
 
 
 async def handle_main_menu(update, context):
     context.user_data["context"] = None
-    context.user_data["index"] = 0
+    paginator.reset(context)
 
     keyboard = [
         [KeyboardButton("MindFlow 🗒"), KeyboardButton("Reflection 💤")],
@@ -36,8 +37,9 @@ async def handle_main_menu(update, context):
         reply_markup=reply_markup,
     )
 
-    try:
-        await remove_expired_reminders(update, context)
 
-    except Exception:
-        pass
+ROUTES = {
+    "В главное меню 🫆": handle_main_menu,
+}
+
+STATES = {}
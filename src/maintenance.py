@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import os
+import time
+
+from sqlalchemy import delete, select
+
+import src.database as database
+import src.paginator as paginator
+import src.scheduler as scheduler
+import src.transcription_cache as transcription_cache
+
+logger = logging.getLogger(__name__)
+
+INTERVAL = float(os.getenv("MAINTENANCE_INTERVAL", 10 * 60))
+BATCH_SIZE = int(os.getenv("MAINTENANCE_BATCH_SIZE", 1000))
+
+state = {"task": None}
+
+
+async def purge_shard(shard, expired_at):
+    total = 0
+    while True:
+        async with database.get_session(shard=shard) as session:
+            result = await session.execute(
+                delete(database.Reminder).where(
+                    database.Reminder.id.in_(
+                        select(database.Reminder.id)
+                        .where(database.Reminder.scheduled_at < expired_at)
+                        .limit(BATCH_SIZE)
+                    )
+                )
+            )
+            total += result.rowcount
+
+        if result.rowcount < BATCH_SIZE:
+            return total
+
+        # Отпускаем блокировку на запись между пачками
+        await asyncio.sleep(0)
+
+
+async def purge_expired_reminders():
+    # Просроченные напоминания из окна догона ещё будут доставлены планировщиком
+    expired_at = time.time() - scheduler.CATCH_UP_WINDOW
+
+    total = sum(await database.fan_out(lambda shard: purge_shard(shard, expired_at)))
+
+    if total:
+        paginator.invalidate(database.Reminder)
+        logger.info("Purged %s expired reminders", total)
+
+    return total
+
+
+async def run():
+    while True:
+        try:
+            await purge_expired_reminders()
+
+        except Exception as e:
+            logger.warning("Failed to purge expired reminders: %s", e)
+
+        try:
+            await transcription_cache.evict()
+
+        except Exception as e:
+            logger.warning("Failed to evict cached transcriptions: %s", e)
+
+        await asyncio.sleep(INTERVAL)
+
+
+def start():
+    state["task"] = asyncio.get_running_loop().create_task(run())
+
+
+async def stop():
+    task = state["task"]
+    if not task:
+        return
+
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+    state["task"] = None
@@ -0,0 +1,96 @@
+import logging
+
+from sqlalchemy import text
+
+import src.user_stats as user_stats
+
+logger = logging.getLogger(__name__)
+
+
+def add_user_indexes(conn):
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_mindflows_user_id_last_modified "
+            "ON mindflows (user_id, last_modified)"
+        )
+    )
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_reflections_user_id_last_modified "
+            "ON reflections (user_id, last_modified)"
+        )
+    )
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_reminders_user_id_last_modified "
+            "ON reminders (user_id, last_modified)"
+        )
+    )
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_reminders_scheduled_at "
+            "ON reminders (scheduled_at)"
+        )
+    )
+
+
+def add_unique_settings_user_id(conn):
+    # Раньше бот читал первую попавшуюся строку пользователя, её и оставляем
+    if conn.dialect.name == "sqlite":
+        keep = "SELECT MIN(rowid) FROM settings GROUP BY user_id"
+        conn.execute(text(f"DELETE FROM settings WHERE rowid NOT IN ({keep})"))
+    else:
+        keep = "SELECT MIN(id) FROM settings GROUP BY user_id"
+        conn.execute(text(f"DELETE FROM settings WHERE id NOT IN ({keep})"))
+
+    conn.execute(
+        text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_settings_user_id "
+            "ON settings (user_id)"
+        )
+    )
+
+
+def add_reflection_stats_index(conn):
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_reflections_user_id_time_spent "
+            "ON reflections (user_id, time_spent, is_interrupt_successfull)"
+        )
+    )
+
+
+def add_user_stats(conn):
+    user_stats.create_triggers(conn)
+    user_stats.rebuild(conn)
+
+
+MIGRATIONS = [
+    (1, add_user_indexes),
+    (2, add_unique_settings_user_id),
+    (3, add_reflection_stats_index),
+    (4, add_user_stats),
+]
+
+
+def get_version(conn):
+    conn.execute(
+        text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+    )
+    version = conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar()
+    return version or 0
+
+
+def upgrade(conn):
+    version = get_version(conn)
+
+    for target, migration in MIGRATIONS:
+        if target <= version:
+            continue
+
+        logger.info("Applying migration %s: %s", target, migration.__name__)
+        migration(conn)
+        conn.execute(
+            text("INSERT INTO schema_version (version) VALUES (:version)"),
+            {"version": target},
+        )
@@ -12,8 +12,11 @@ from telegram.ext import (
 )
 
 import src.database as database
-import src.tts as tts
-from src.main_menu import *
+import src.main_menu as main_menu
+import src.paginator as paginator
+import src.stats as stats
+import src.transcriber as transcriber
+import src.writer as writer
 
 
 async def handle_mindflow_menu(update, context):
@@ -23,13 +26,7 @@ async def handle_mindflow_menu(update, context):
 
     total_notes = 0
     try:
-        async with database.get_session() as session:
-            result = await session.execute(
-                select(func.count())
-                .select_from(database.Mindflow)
-                .where(database.Mindflow.user_id == user_id)
-            )
-            total_notes = result.scalar()
+        total_notes = await stats.get_count(database.Mindflow, user_id)
 
     except Exception as e:
         pass
@@ -79,68 +76,59 @@ async def handle_mindflow_adding(update, context):
 
     user_id = update.effective_user.id
     last_modified = update.message.date.timestamp()
+    state = context.user_data["context"]
 
-    try:
-        notes = await tts.ensure_text_message(update, context)
-
-    except Exception as e:
-        return await update.message.reply_text(
-            "Не удалось распознать голосовое... 😓\n" "Попробуй ещё раз!" f"\n\n{e}"
-        )
-
-    try:
-        async with database.get_session() as session:
+    async def save(notes):
+        try:
             mindflow = database.Mindflow(
                 user_id=user_id, last_modified=last_modified, notes=notes
             )
-            session.add(mindflow)
+            await writer.add(mindflow)
 
-        await update.message.reply_text("Мысль успешно записана в MindFlow! 🎉")
-        await handle_mindflow_menu(update, context)
+            paginator.invalidate(database.Mindflow, user_id)
+            await update.message.reply_text("Мысль успешно записана в MindFlow! 🎉")
 
-    except Exception as e:
-        await update.message.reply_text(
-            "Что-то пошло не так... 😓\n" "Попробуй ещё раз!" f"\n\n{e}"
-        )
+            # Голосовое сохраняется после распознавания, когда пользователь мог
+            # уже уйти в другой раздел: тогда его состояние не трогаем
+            if context.user_data.get("context") == state:
+                await handle_mindflow_menu(update, context)
+
+        except Exception as e:
+            await update.message.reply_text(
+                "Что-то пошло не так... 😓\n" "Попробуй ещё раз!" f"\n\n{e}"
+            )
+
+    await transcriber.submit(update, context, save)
 
 
 async def handle_mindflow_show(update, context):
     context.user_data["context"] = None
 
-    index = context.user_data.get("index", 0)
-    user_id = update.effective_user.id
-
     notes = str()
     try:
-        async with database.get_session() as session:
-            result = await session.execute(
-                select(database.Mindflow)
-                .where(database.Mindflow.user_id == user_id)
-                .offset(index)
-                .limit(1)
-            )
-            mindflow = result.scalar_one_or_none()
+        mindflow = await paginator.current(database.Mindflow, update, context)
+        index = context.user_data.get("index", 0)
 
-            date_timestamp = mindflow.last_modified
-            date_dt = dt.datetime.fromtimestamp(date_timestamp)
-            date = date_dt.strftime("%d.%m.%Y %H:%M")
+        date_timestamp = mindflow.last_modified
+        date_dt = dt.datetime.fromtimestamp(date_timestamp)
+        date = date_dt.strftime("%d.%m.%Y %H:%M")
 
-            notes = mindflow.notes
+        notes = mindflow.notes
 
     except AttributeError:
         await update.message.reply_text(
             "В MindFlow пока что нет записей. Запишите сюда что-нибудь! 😅",
             reply_markup=ReplyKeyboardRemove(),
         )
-        context.user_data["index"] = 0
+        paginator.reset(context)
         return await handle_mindflow_menu(update, context)
 
     except Exception as e:
         await update.message.reply_text(
             "Что-то пошло не так... 😓\n" "Попробуй ещё раз!" f"\n\n{e}"
         )
-        context.user_data["index"] = 0
-        return await handle_main_menu(update, context)
+        paginator.reset(context)
+        return await main_menu.handle_main_menu(update, context)
 
     keyboard = [
         [KeyboardButton("Назад ⬅️ (M)"), KeyboardButton("Вперёд ➡️ (M)")],
@@ -161,20 +149,8 @@ async def handle_mindflow_show(update, context):
 
 
 async def handle_mindflow_back(update, context):
-    index = context.user_data.get("index", 0)
-    user_id = update.effective_user.id
-
     try:
-        async with database.get_session() as session:
-            result = await session.execute(
-                select(database.Mindflow)
-                .where(database.Mindflow.user_id == user_id)
-                .offset(index - 1)
-                .limit(1)
-            )
-            previous_mindflow = result.scalar_one_or_none()
-            if previous_mindflow and index - 1 >= 0:
-                context.user_data["index"] = index - 1
+        await paginator.back(database.Mindflow, update, context)
 
     except Exception as e:
         pass
@@ -184,20 +160,8 @@ async def handle_mindflow_back(update, context):
 
 
 async def handle_mindflow_forward(update, context):
-    index = context.user_data.get("index", 0)
-    user_id = update.effective_user.id
-
     try:
-        async with database.get_session() as session:
-            result = await session.execute(
-                select(database.Mindflow)
-                .where(database.Mindflow.user_id == user_id)
-                .offset(index + 1)
-                .limit(1)
-            )
-            next_mindflow = result.scalar_one_or_none()
-            if next_mindflow:
-                context.user_data["index"] = index + 1
+        await paginator.forward(database.Mindflow, update, context)
 
     except Exception as e:
         pass
@@ -207,19 +171,8 @@ async def handle_mindflow_forward(update, context):
 
 
 async def handle_mindflow_begin(update, context):
-    user_id = update.effective_user.id
-
     try:
-        async with database.get_session() as session:
-            result = await session.execute(
-                select(database.Mindflow)
-                .where(database.Mindflow.user_id == user_id)
-                .offset(0)
-                .limit(1)
-            )
-            previous_mindflow = result.scalar_one_or_none()
-            if previous_mindflow:
-                context.user_data["index"] = 0
+        await paginator.begin(database.Mindflow, update, context)
 
     except Exception as e:
         pass
@@ -229,29 +182,26 @@ async def handle_mindflow_begin(update, context):
 
 
 async def handle_mindflow_end(update, context):
-    user_id = update.effective_user.id
-
     try:
-        async with database.get_session() as session:
-            result = await session.execute(
-                select(func.count())
-                .select_from(database.Mindflow)
-                .where(database.Mindflow.user_id == user_id)
-            )
-            index = result.scalar() - 1
-
-            result = await session.execute(
-                select(database.Mindflow)
-                .where(database.Mindflow.user_id == user_id)
-                .offset(index)
-                .limit(1)
-            )
-            next_mindflow = result.scalar_one_or_none()
-            if next_mindflow:
-                context.user_data["index"] = index
+        await paginator.end(database.Mindflow, update, context)
 
     except Exception as e:
         pass
 
     finally:
         return await handle_mindflow_show(update, context)
+
+
+ROUTES = {
+    "MindFlow 🗒": handle_mindflow_menu,
+    "Добавить 🖊 (M)": handle_mindflow_add,
+    "Смотреть 👀 (M)": handle_mindflow_show,
+    "Назад ⬅️ (M)": handle_mindflow_back,
+    "Вперёд ➡️ (M)": handle_mindflow_forward,
+    "В начало ⬅️ (M)": handle_mindflow_begin,
+    "В конец ➡️ (M)": handle_mindflow_end,
+}
+
+STATES = {
+    "ENTERING_MINDFLOW": handle_mindflow_adding,
+}
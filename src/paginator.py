@@ -0,0 +1,260 @@
+import asyncio
+import bisect
+import logging
+from collections import OrderedDict
+
+from sqlalchemy import case, func, literal, select, tuple_
+
+import src.database as database
+import src.stats as stats
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SIZE = 20
+REFILL_MARGIN = 5
+MAX_WINDOWS = 1024
+
+windows = OrderedDict()
+generations = {}
+# Ключ окна -> задача догрузки: держим ссылку, иначе задачу может собрать GC
+refills = {}
+
+
+class Window:
+    def __init__(self, records, offset, total):
+        self.records = records
+        self.keys = [get_cursor(record) for record in records]
+        self.offset = offset
+        self.total = total
+
+    @property
+    def has_before(self):
+        return self.offset > 0
+
+    @property
+    def has_after(self):
+        return self.offset + len(self.records) < self.total
+
+    def position(self, cursor):
+        if not cursor:
+            return 0
+        return bisect.bisect_left(self.keys, tuple(cursor))
+
+
+def get_cursor(record):
+    return (record.last_modified, record.id)
+
+
+def get_key(model, user_id):
+    return (model.__tablename__, user_id)
+
+
+def reset(context):
+    context.user_data["index"] = 0
+    context.user_data["cursor"] = None
+
+
+def invalidate(model, user_id=None):
+    key = model.__tablename__ if user_id is None else get_key(model, user_id)
+    generations[key] = generations.get(key, 0) + 1
+
+    for cached in list(windows):
+        if cached[0] == model.__tablename__ and user_id in (None, cached[1]):
+            del windows[cached]
+
+
+def get_generation(model, user_id):
+    return (
+        generations.get(model.__tablename__, 0),
+        generations.get(get_key(model, user_id), 0),
+    )
+
+
+def ordered(model, user_id):
+    return select(model).where(model.user_id == user_id)
+
+
+async def fetch_window(session, model, user_id, cursor=None, tail=False):
+    order_key = tuple_(model.last_modified, model.id)
+    ascending = (model.last_modified, model.id)
+    descending = (model.last_modified.desc(), model.id.desc())
+
+    if tail:
+        result = await session.execute(
+            ordered(model, user_id).order_by(*descending).limit(WINDOW_SIZE)
+        )
+        records = list(reversed(result.scalars().all()))
+
+        total = await stats.fetch_count(session, model, user_id)
+        return Window(records, total - len(records), total)
+
+    before = []
+    after_query = ordered(model, user_id)
+    counts_query = select(func.count(), literal(0))
+    if cursor:
+        result = await session.execute(
+            ordered(model, user_id)
+            .where(order_key < tuple(cursor))
+            .order_by(*descending)
+            .limit(WINDOW_SIZE)
+        )
+        before = list(reversed(result.scalars().all()))
+        after_query = after_query.where(order_key >= tuple(cursor))
+        counts_query = select(
+            func.count(), func.sum(case((order_key < tuple(cursor), 1), else_=0))
+        )
+
+    result = await session.execute(
+        after_query.order_by(*ascending).limit(WINDOW_SIZE + 1)
+    )
+    after = result.scalars().all()
+
+    result = await session.execute(
+        counts_query.select_from(model).where(model.user_id == user_id)
+    )
+    total, preceding = result.one()
+    return Window(before + after, (preceding or 0) - len(before), total)
+
+
+async def load(model, user_id, cursor=None, tail=False):
+    key = get_key(model, user_id)
+    generation = get_generation(model, user_id)
+
+    async with database.get_session(user_id) as session:
+        window = await fetch_window(session, model, user_id, cursor, tail)
+
+    if get_generation(model, user_id) == generation:
+        windows[key] = window
+        windows.move_to_end(key)
+        while len(windows) > MAX_WINDOWS:
+            windows.popitem(last=False)
+
+    return window
+
+
+async def refill(model, user_id, cursor):
+    key = get_key(model, user_id)
+    try:
+        await load(model, user_id, cursor)
+
+    except Exception as e:
+        logger.warning("Failed to refill navigation window %s: %s", key, e)
+
+    finally:
+        refills.pop(key, None)
+
+
+def schedule_refill(model, user_id, window, position):
+    key = get_key(model, user_id)
+    near_start = position < REFILL_MARGIN and window.has_before
+    near_end = len(window.records) - position <= REFILL_MARGIN and window.has_after
+    if key in refills or not (near_start or near_end):
+        return
+
+    refills[key] = asyncio.get_running_loop().create_task(
+        refill(model, user_id, window.keys[position])
+    )
+
+
+async def get_window(model, user_id, cursor):
+    window = windows.get(get_key(model, user_id), None)
+    if window is None or (not cursor and window.has_before):
+        return await load(model, user_id, cursor)
+
+    windows.move_to_end(get_key(model, user_id))
+    return window
+
+
+def select_record(model, user_id, context, window, position):
+    record = window.records[position]
+    context.user_data["cursor"] = window.keys[position]
+    context.user_data["index"] = window.offset + position
+    schedule_refill(model, user_id, window, position)
+    return record
+
+
+async def current(model, update, context):
+    user_id = update.effective_user.id
+    cursor = context.user_data.get("cursor", None)
+
+    window = await get_window(model, user_id, cursor)
+    position = window.position(cursor)
+    found = window.keys[position : position + 1] == [tuple(cursor or ())]
+    at_start = position == 0 and window.has_before
+    at_end = position == len(window.records) and window.has_after
+    if not found and (at_start or at_end):
+        window = await load(model, user_id, cursor)
+        position = window.position(cursor)
+
+    # Запись под курсором могла исчезнуть (например, сработало напоминание)
+    if position == len(window.records):
+        position -= 1
+
+    if position < 0:
+        reset(context)
+        return None
+
+    return select_record(model, user_id, context, window, position)
+
+
+async def back(model, update, context):
+    user_id = update.effective_user.id
+    cursor = context.user_data.get("cursor", None)
+
+    if not cursor:
+        return None
+
+    window = await get_window(model, user_id, cursor)
+    position = window.position(cursor)
+    if position == 0 and window.has_before:
+        window = await load(model, user_id, cursor)
+        position = window.position(cursor)
+
+    if position == 0:
+        return None
+
+    return select_record(model, user_id, context, window, position - 1)
+
+
+async def forward(model, update, context):
+    user_id = update.effective_user.id
+    cursor = context.user_data.get("cursor", None)
+
+    window = await get_window(model, user_id, cursor)
+    position = window.position(cursor)
+    if position + 1 >= len(window.records) and window.has_after:
+        window = await load(model, user_id, cursor)
+        position = window.position(cursor)
+
+    if position + 1 >= len(window.records):
+        return None
+
+    return select_record(model, user_id, context, window, position + 1)
+
+
+async def begin(model, update, context):
+    user_id = update.effective_user.id
+    cursor = context.user_data.get("cursor", None)
+
+    window = await get_window(model, user_id, cursor)
+    if window.has_before:
+        window = await load(model, user_id)
+
+    if not window.records:
+        return None
+
+    return select_record(model, user_id, context, window, 0)
+
+
+async def end(model, update, context):
+    user_id = update.effective_user.id
+    cursor = context.user_data.get("cursor", None)
+
+    window = await get_window(model, user_id, cursor)
+    if window.has_after:
+        window = await load(model, user_id, tail=True)
+
+    if not window.records:
+        return None
+
+    return select_record(model, user_id, context, window, len(window.records) - 1)
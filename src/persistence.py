@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import os
+import pickle
+import time
+
+from sqlalchemy import delete, select
+from telegram.ext import BasePersistence, PersistenceInput
+
+import src.database as database
+
+logger = logging.getLogger(__name__)
+
+UPDATE_INTERVAL = float(os.getenv("PERSISTENCE_UPDATE_INTERVAL", 10))
+
+
+class DatabasePersistence(BasePersistence):
+    # Храним только user_data: по строке на пользователя в его шарде.
+    # Загружаем при первом апдейте пользователя, пишем только изменившиеся
+    def __init__(self, update_interval=UPDATE_INTERVAL):
+        super().__init__(
+            store_data=PersistenceInput(
+                bot_data=False, chat_data=False, user_data=True, callback_data=False
+            ),
+            update_interval=update_interval,
+        )
+        self.snapshots = {}
+        self.dirty = {}
+        self.pending = None
+        self.metrics = {"loads": 0, "flushes": 0, "rows": 0, "skipped": 0}
+
+    async def get_user_data(self):
+        return {}
+
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name):
+        return {}
+
+    async def update_conversation(self, name, key, new_state):
+        pass
+
+    async def update_chat_data(self, chat_id, data):
+        pass
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def drop_chat_data(self, chat_id):
+        pass
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    async def refresh_user_data(self, user_id, user_data):
+        if user_id in self.snapshots:
+            return
+
+        async with database.get_session(user_id) as session:
+            data = await session.scalar(
+                select(database.UserData.data).where(
+                    database.UserData.user_id == user_id
+                )
+            )
+
+        self.snapshots[user_id] = data
+        self.metrics["loads"] += 1
+        if data:
+            user_data.update(pickle.loads(data))
+
+    async def update_user_data(self, user_id, data):
+        data = pickle.dumps(data)
+        if self.snapshots.get(user_id) == data:
+            self.metrics["skipped"] += 1
+            return
+
+        self.dirty[user_id] = data
+        if self.pending is None:
+            self.pending = asyncio.get_running_loop().create_task(self.write())
+        await asyncio.shield(self.pending)
+
+    async def write(self):
+        # Application вызывает update_user_data для всех пользователей разом,
+        # даём им встать в очередь и пишем одним запросом на шард
+        await asyncio.sleep(0)
+        dirty, self.dirty, self.pending = self.dirty, {}, None
+
+        shards = {}
+        now = time.time()
+        for user_id, data in dirty.items():
+            shards.setdefault(database.get_shard(user_id), []).append(
+                {"user_id": user_id, "updated_at": now, "data": data}
+            )
+
+        try:
+            await asyncio.gather(
+                *(self.write_shard(shard, rows) for shard, rows in shards.items())
+            )
+
+        except Exception:
+            # Не теряем состояние: запишем со следующим обновлением
+            for user_id, data in dirty.items():
+                self.dirty.setdefault(user_id, data)
+            raise
+
+        self.snapshots.update(dirty)
+        self.metrics["flushes"] += 1
+        self.metrics["rows"] += len(dirty)
+
+    async def write_shard(self, shard, rows):
+        statement = database.insert(database.UserData)
+        statement = statement.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={
+                "updated_at": statement.excluded.updated_at,
+                "data": statement.excluded.data,
+            },
+        )
+
+        async with database.get_session(shard=shard) as session:
+            await session.execute(statement, rows)
+
+    async def drop_user_data(self, user_id):
+        self.snapshots.pop(user_id, None)
+        self.dirty.pop(user_id, None)
+
+        async with database.get_session(user_id) as session:
+            await session.execute(
+                delete(database.UserData).where(database.UserData.user_id == user_id)
+            )
+
+    async def flush(self):
+        if self.pending:
+            await self.pending
+        if self.dirty:
+            await self.write()
@@ -1,7 +1,6 @@
 import datetime as dt
 import logging
 
-import pandas as pd
 from sqlalchemy import func, select
 from telegram import KeyboardButton, ReplyKeyboardMarkup, ReplyKeyboardRemove
 from telegram.ext import (
@@ -13,7 +12,10 @@ from telegram.ext import (
 )
 
 import src.database as database
-from src.main_menu import *
+import src.main_menu as main_menu
+import src.paginator as paginator
+import src.stats as stats
+import src.writer as writer
 
 
 async def handle_reflection_menu(update, context):
@@ -23,11 +25,12 @@ async def handle_reflection_menu(update, context):
 
     total_hyperfocuses = 0
     positive_hyperfocuses = 0
+    time_spent = {0: 0, 1: 0, 2: 0}
     try:
-        df = await database.load_to_df(select(database.Reflection))
-        df = df[df["user_id"] == user_id]
-        total_hyperfocuses = len(df)
-        positive_hyperfocuses = len(df[df["is_interrupt_successfull"] == True])
+        reflection_stats = await stats.get_reflection_stats(user_id)
+        total_hyperfocuses = reflection_stats["total"]
+        positive_hyperfocuses = reflection_stats["successful"]
+        time_spent = reflection_stats["time_spent"]
 
     except Exception as e:
         pass
@@ -47,7 +50,8 @@ async def handle_reflection_menu(update, context):
 
     await update.message.reply_text(
         "Reflection - твой способ отслеживать залипания! ✌️\n"
-        f"На данный момент отслежено {total_hyperfocuses} залипаний 🫣, из них {positive_hyperfocuses} - положительные 👀",
+        f"На данный момент отслежено {total_hyperfocuses} залипаний 🫣, из них {positive_hyperfocuses} - положительные 👀\n"
+        f"Быстро ⌛️ {time_spent[0]}, средне 🕰 {time_spent[1]}, долго ♾️ {time_spent[2]}",
         reply_markup=reply_markup,
     )
 
@@ -138,15 +142,15 @@ async def handle_reflection_interrupt(update, context):
     is_interrupt_successfull = successfull
 
     try:
-        async with database.get_session() as session:
-            reflection = database.Reflection(
-                user_id=user_id,
-                last_modified=last_modified,
-                time_spent=time_spent,
-                is_interrupt_successfull=is_interrupt_successfull,
-            )
-            session.add(reflection)
+        reflection = database.Reflection(
+            user_id=user_id,
+            last_modified=last_modified,
+            time_spent=time_spent,
+            is_interrupt_successfull=is_interrupt_successfull,
+        )
+        await writer.add(reflection)
 
+        paginator.invalidate(database.Reflection, user_id)
         await update.message.reply_text("Залипание успешно записано в Reflection! 🎉")
         await handle_reflection_menu(update, context)
 
@@ -159,42 +163,33 @@ async def handle_reflection_interrupt(update, context):
 async def handle_reflection_show(update, context):
     context.user_data["context"] = None
 
-    index = context.user_data.get("index", 0)
-    user_id = update.effective_user.id
-
     notes = str()
     try:
-        async with database.get_session() as session:
-            result = await session.execute(
-                select(database.Reflection)
-                .where(database.Reflection.user_id == user_id)
-                .offset(index)
-                .limit(1)
-            )
-            reflection = result.scalar_one_or_none()
-
-            date_timestamp = reflection.last_modified
-            date_dt = dt.datetime.fromtimestamp(date_timestamp)
-            date = date_dt.strftime("%d.%m.%Y %H:%M")
-
-            successfull = "нет :("
-            if reflection.is_interrupt_successfull:
-                successfull = "да :)"
+        reflection = await paginator.current(database.Reflection, update, context)
+        index = context.user_data.get("index", 0)
+
+        date_timestamp = reflection.last_modified
+        date_dt = dt.datetime.fromtimestamp(date_timestamp)
+        date = date_dt.strftime("%d.%m.%Y %H:%M")
+
+        successfull = "нет :("
+        if reflection.is_interrupt_successfull:
+            successfull = "да :)"
 
     except AttributeError:
         await update.message.reply_text(
             "В Reflection пока что нет залипаний. Запишите сюда что-нибудь! 😅",
             reply_markup=ReplyKeyboardRemove(),
         )
-        context.user_data["index"] = 0
+        paginator.reset(context)
         return await handle_reflection_menu(update, context)
 
     except Exception as e:
         await update.message.reply_text(
             "Что-то пошло не так... 😓\n" "Попробуй ещё раз!" f"\n\n{e}"
         )
-        context.user_data["index"] = 0
-        return await handle_main_menu(update, context)
+        paginator.reset(context)
+        return await main_menu.handle_main_menu(update, context)
 
     keyboard = [
         [KeyboardButton("Назад ⬅️ (R)"), KeyboardButton("Вперёд ➡️ (R)")],
@@ -219,20 +214,8 @@ async def handle_reflection_show(update, context):
 
 
 async def handle_reflection_back(update, context):
-    index = context.user_data.get("index", 0)
-    user_id = update.effective_user.id
-
     try:
-        async with database.get_session() as session:
-            result = await session.execute(
-                select(database.Reflection)
-                .where(database.Reflection.user_id == user_id)
-                .offset(index - 1)
-                .limit(1)
-            )
-            previous_reflection = result.scalar_one_or_none()
-            if previous_reflection and index - 1 >= 0:
-                context.user_data["index"] = index - 1
+        await paginator.back(database.Reflection, update, context)
 
     except Exception as e:
         pass
@@ -242,20 +225,8 @@ async def handle_reflection_back(update, context):
 
 
 async def handle_reflection_forward(update, context):
-    index = context.user_data.get("index", 0)
-    user_id = update.effective_user.id
-
     try:
-        async with database.get_session() as session:
-            result = await session.execute(
-                select(database.Reflection)
-                .where(database.Reflection.user_id == user_id)
-                .offset(index + 1)
-                .limit(1)
-            )
-            next_reflection = result.scalar_one_or_none()
-            if next_reflection:
-                context.user_data["index"] = index + 1
+        await paginator.forward(database.Reflection, update, context)
 
     except Exception as e:
         pass
@@ -265,19 +236,8 @@ async def handle_reflection_forward(update, context):
 
 
 async def handle_reflection_begin(update, context):
-    user_id = update.effective_user.id
-
     try:
-        async with database.get_session() as session:
-            result = await session.execute(
-                select(database.Reflection)
-                .where(database.Reflection.user_id == user_id)
-                .offset(0)
-                .limit(1)
-            )
-            previous_reflection = result.scalar_one_or_none()
-            if previous_reflection:
-                context.user_data["index"] = 0
+        await paginator.begin(database.Reflection, update, context)
 
     except Exception as e:
         pass
@@ -287,29 +247,27 @@ async def handle_reflection_begin(update, context):
 
 
 async def handle_reflection_end(update, context):
-    user_id = update.effective_user.id
-
     try:
-        async with database.get_session() as session:
-            result = await session.execute(
-                select(func.count())
-                .select_from(database.Reflection)
-                .where(database.Reflection.user_id == user_id)
-            )
-            index = result.scalar() - 1
-
-            result = await session.execute(
-                select(database.Reflection)
-                .where(database.Reflection.user_id == user_id)
-                .offset(index)
-                .limit(1)
-            )
-            next_reflection = result.scalar_one_or_none()
-            if next_reflection:
-                context.user_data["index"] = index
+        await paginator.end(database.Reflection, update, context)
 
     except Exception as e:
         pass
 
     finally:
         return await handle_reflection_show(update, context)
+
+
+ROUTES = {
+    "Reflection 💤": handle_reflection_menu,
+    "Добавить 🖊 (R)": handle_reflection_add,
+    "Смотреть 👀 (R)": handle_reflection_show,
+    "Назад ⬅️ (R)": handle_reflection_back,
+    "Вперёд ➡️ (R)": handle_reflection_forward,
+    "В начало ⬅️ (R)": handle_reflection_begin,
+    "В конец ➡️ (R)": handle_reflection_end,
+}
+
+STATES = {
+    "ENTERING_REFLECTION_TIME_SPENT": handle_reflection_time_spent,
+    "ENTERING_REFLECTION_INTERRUPT": handle_reflection_interrupt,
+}
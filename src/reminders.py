@@ -2,7 +2,6 @@ import datetime as dt
 import logging
 import uuid
 
-import pandas as pd
 from sqlalchemy import delete, func, select
 from telegram import KeyboardButton, ReplyKeyboardMarkup, ReplyKeyboardRemove
 from telegram.ext import (
@@ -14,8 +13,12 @@ from telegram.ext import (
 )
 
 import src.database as database
-import src.tts as tts
-from src.main_menu import *
+import src.main_menu as main_menu
+import src.paginator as paginator
+import src.scheduler as scheduler
+import src.stats as stats
+import src.transcriber as transcriber
+import src.writer as writer
 
 
 async def handle_reminders_menu(update, context):
@@ -25,15 +28,7 @@ async def handle_reminders_menu(update, context):
 
     total_reminders = 0
     try:
-        await remove_expired_reminders(update, context)
-
-        async with database.get_session() as session:
-            result = await session.execute(
-                select(func.count())
-                .select_from(database.Reminder)
-                .where(database.Reminder.user_id == user_id)
-            )
-            total_reminders = result.scalar()
+        total_reminders = await stats.get_count(database.Reminder, user_id)
 
     except Exception as e:
         pass
@@ -151,17 +146,10 @@ async def handle_reminders_header(update, context):
     chat_id = update.effective_message.chat_id
     last_modified = update.message.date.timestamp()
     scheduled_at = context.user_data["due"].timestamp()
+    state = context.user_data["context"]
 
-    try:
-        header = await tts.ensure_text_message(update, context)
-
-    except Exception as e:
-        return await update.message.reply_text(
-            "Не удалось распознать голосовое... 😓\n" "Попробуй ещё раз!" f"\n\n{e}"
-        )
-
-    try:
-        async with database.get_session() as session:
+    async def save(header):
+        try:
             reminder = database.Reminder(
                 user_id=user_id,
                 id=str(uuid.uuid4()),
@@ -170,101 +158,57 @@ async def handle_reminders_header(update, context):
                 scheduled_at=scheduled_at,
                 header=header,
             )
-            session.add(reminder)
-
-            context.job_queue.run_once(
-                handle_reminder,
-                context.user_data["due"],
-                user_id=user_id,
-                chat_id=chat_id,
-                data=reminder.id,
-            )
-
-        await update.message.reply_text("Напоминание успешно составлено!")
-        await handle_reminders_menu(update, context)
-
-    except Exception as e:
-        await update.message.reply_text(
-            "Что-то пошло не так... 😓\n" "Попробуй ещё раз!" f"\n\n{e}"
-        )
-
-
-async def handle_reminder(context):
-    try:
-        job = context.job
-        reminder_id = job.data
-
-        async with database.get_session() as session:
-            result = await session.execute(
-                select(database.Reminder)
-                .where(database.Reminder.id == reminder_id)
-                .limit(1)
-            )
-            reminder = result.scalar_one_or_none()
+            await writer.add(reminder)
 
-            chat_id = reminder.chat_id
-            header = reminder.header
+            scheduler.add(reminder.id, scheduled_at, user_id)
+            paginator.invalidate(database.Reminder, user_id)
+            await update.message.reply_text("Напоминание успешно составлено!")
 
-            await context.bot.send_message(chat_id, text=f"Напоминание: {header} 📌")
+            # Голосовое сохраняется после распознавания, когда пользователь мог
+            # уже уйти в другой раздел: тогда его состояние не трогаем
+            if context.user_data.get("context") == state:
+                await handle_reminders_menu(update, context)
 
-            await session.execute(
-                delete(database.Reminder).where(database.Reminder.id == reminder_id)
+        except Exception as e:
+            await update.message.reply_text(
+                "Что-то пошло не так... 😓\n" "Попробуй ещё раз!" f"\n\n{e}"
             )
 
-    except Exception as e:
-        pass
-
-
-async def remove_expired_reminders(update, context):
-    async with database.get_session() as session:
-        await session.execute(
-            delete(database.Reminder).where(
-                database.Reminder.scheduled_at < update.message.date.timestamp()
-            )
-        )
+    await transcriber.submit(update, context, save)
 
 
 async def handle_reminders_show(update, context):
     context.user_data["context"] = None
 
-    index = context.user_data.get("index", 0)
-    user_id = update.effective_user.id
-
     notes = str()
     try:
-        async with database.get_session() as session:
-            result = await session.execute(
-                select(database.Reminder)
-                .where(database.Reminder.user_id == user_id)
-                .offset(index)
-                .limit(1)
-            )
-            reminder = result.scalar_one_or_none()
+        reminder = await paginator.current(database.Reminder, update, context)
+        index = context.user_data.get("index", 0)
 
-            date_timestamp = reminder.last_modified
-            date_dt = dt.datetime.fromtimestamp(date_timestamp)
-            date = date_dt.strftime("%d.%m.%Y %H:%M")
+        date_timestamp = reminder.last_modified
+        date_dt = dt.datetime.fromtimestamp(date_timestamp)
+        date = date_dt.strftime("%d.%m.%Y %H:%M")
 
-            due_timestamp = reminder.scheduled_at
-            due_dt = dt.datetime.fromtimestamp(due_timestamp)
-            due_date = due_dt.strftime("%d.%m.%Y %H:%M")
+        due_timestamp = reminder.scheduled_at
+        due_dt = dt.datetime.fromtimestamp(due_timestamp)
+        due_date = due_dt.strftime("%d.%m.%Y %H:%M")
 
-            header = reminder.header
+        header = reminder.header
 
     except AttributeError:
         await update.message.reply_text(
             "Напоминаний пока что нет. Запишите сюда что-нибудь! 😅",
             reply_markup=ReplyKeyboardRemove(),
         )
-        context.user_data["index"] = 0
+        paginator.reset(context)
         return await handle_reminders_menu(update, context)
 
     except Exception as e:
         await update.message.reply_text(
             "Что-то пошло не так... 😓\n" "Попробуй ещё раз!" f"\n\n{e}"
         )
-        context.user_data["index"] = 0
-        return await handle_main_menu(update, context)
+        paginator.reset(context)
+        return await main_menu.handle_main_menu(update, context)
 
     keyboard = [
         [KeyboardButton("Назад ⬅️ (Н)"), KeyboardButton("Вперёд ➡️ (Н)")],
@@ -290,20 +234,8 @@ async def handle_reminders_show(update, context):
 
 
 async def handle_reminders_back(update, context):
-    index = context.user_data.get("index", 0)
-    user_id = update.effective_user.id
-
     try:
-        async with database.get_session() as session:
-            result = await session.execute(
-                select(database.Reminder)
-                .where(database.Reminder.user_id == user_id)
-                .offset(index - 1)
-                .limit(1)
-            )
-            previous_reminder = result.scalar_one_or_none()
-            if previous_reminder and index - 1 >= 0:
-                context.user_data["index"] = index - 1
+        await paginator.back(database.Reminder, update, context)
 
     except Exception as e:
         pass
@@ -313,20 +245,8 @@ async def handle_reminders_back(update, context):
 
 
 async def handle_reminders_forward(update, context):
-    index = context.user_data.get("index", 0)
-    user_id = update.effective_user.id
-
     try:
-        async with database.get_session() as session:
-            result = await session.execute(
-                select(database.Reminder)
-                .where(database.Reminder.user_id == user_id)
-                .offset(index + 1)
-                .limit(1)
-            )
-            next_reminder = result.scalar_one_or_none()
-            if next_reminder:
-                context.user_data["index"] = index + 1
+        await paginator.forward(database.Reminder, update, context)
 
     except Exception as e:
         pass
@@ -336,19 +256,8 @@ async def handle_reminders_forward(update, context):
 
 
 async def handle_reminders_begin(update, context):
-    user_id = update.effective_user.id
-
     try:
-        async with database.get_session() as session:
-            result = await session.execute(
-                select(database.Reminder)
-                .where(database.Reminder.user_id == user_id)
-                .offset(0)
-                .limit(1)
-            )
-            previous_reminder = result.scalar_one_or_none()
-            if previous_reminder:
-                context.user_data["index"] = 0
+        await paginator.begin(database.Reminder, update, context)
 
     except Exception as e:
         pass
@@ -358,29 +267,27 @@ async def handle_reminders_begin(update, context):
 
 
 async def handle_reminders_end(update, context):
-    user_id = update.effective_user.id
-
     try:
-        async with database.get_session() as session:
-            result = await session.execute(
-                select(func.count())
-                .select_from(database.Reminder)
-                .where(database.Reminder.user_id == user_id)
-            )
-            index = result.scalar() - 1
-
-            result = await session.execute(
-                select(database.Reminder)
-                .where(database.Reminder.user_id == user_id)
-                .offset(index)
-                .limit(1)
-            )
-            next_reminder = result.scalar_one_or_none()
-            if next_reminder:
-                context.user_data["index"] = index
+        await paginator.end(database.Reminder, update, context)
 
     except Exception as e:
         pass
 
     finally:
         return await handle_reminders_show(update, context)
+
+
+ROUTES = {
+    "Напоминания 📌": handle_reminders_menu,
+    "Добавить 🖊 (Н)": handle_reminders_add,
+    "Смотреть 👀 (Н)": handle_reminders_show,
+    "Назад ⬅️ (Н)": handle_reminders_back,
+    "Вперёд ➡️ (Н)": handle_reminders_forward,
+    "В начало ⬅️ (Н)": handle_reminders_begin,
+    "В конец ➡️ (Н)": handle_reminders_end,
+}
+
+STATES = {
+    "ENTERING_REMINDER_SCHEDULED_AT": handle_reminders_scheduled_at,
+    "ENTERING_REMINDER_HEADER": handle_reminders_header,
+}
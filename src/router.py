@@ -0,0 +1,55 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Точный текст кнопки -> обработчик; состояние диалога -> обработчик ввода
+ROUTES = {}
+STATES = {}
+
+# Хуки вызываются как hook(name, duration) после каждого обработчика
+hooks = []
+metrics = {}
+
+
+def register(routes, states):
+    for text in routes.keys() & ROUTES.keys():
+        logger.warning("Route %r is registered twice", text)
+    ROUTES.update(routes)
+    STATES.update(states)
+
+
+def record(name, duration):
+    route = metrics.setdefault(name, {"calls": 0, "total": 0.0, "max": 0.0})
+    route["calls"] += 1
+    route["total"] += duration
+    route["max"] = max(route["max"], duration)
+
+
+hooks.append(record)
+
+
+async def handle_unknown(update, context):
+    return await update.message.reply_text(
+        "Что-то непонятное... 😴\n" "Попробуй ещё раз!"
+    )
+
+
+def resolve(update, context):
+    handler = ROUTES.get(update.message.text)
+    if handler is None:
+        handler = STATES.get(context.user_data.get("context"), handle_unknown)
+    return handler
+
+
+async def dispatch(update, context):
+    handler = resolve(update, context)
+
+    started = time.perf_counter()
+    try:
+        return await handler(update, context)
+
+    finally:
+        duration = time.perf_counter() - started
+        for hook in hooks:
+            hook(handler.__name__, duration)
@@ -0,0 +1,240 @@
+import asyncio
+import heapq
+import logging
+import math
+import os
+import time
+
+from sqlalchemy import delete, select
+from telegram.error import BadRequest, Forbidden
+
+import src.database as database
+import src.paginator as paginator
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 10_000
+CATCH_UP_WINDOW = float(os.getenv("REMINDERS_CATCH_UP_WINDOW", 24 * 60 * 60))
+TICK = float(os.getenv("REMINDERS_TICK", 1))
+PARALLELISM = int(os.getenv("REMINDERS_PARALLELISM", 20))
+MAX_BATCH = 500
+RETRY_DELAY = 60
+# Бот заблокирован или чата больше нет: повторять бессмысленно
+FINAL_ERRORS = (Forbidden, BadRequest)
+
+queue = []
+wakeup = asyncio.Event()
+state = {"bot": None, "task": None}
+metrics = {
+    "ticks": 0,
+    "delivered": 0,
+    "failed": 0,
+    "dropped": 0,
+    "max_lag": 0.0,
+    "last_tick": None,
+}
+
+
+def add(reminder_id, scheduled_at, user_id):
+    heapq.heappush(queue, (scheduled_at, reminder_id, user_id))
+    if queue[0][1] == reminder_id:
+        wakeup.set()
+
+
+async def load_shard(shard):
+    rows = []
+
+    async with database.get_session(shard=shard) as session:
+        conn = await session.connection()
+        result = await conn.stream(
+            select(
+                database.Reminder.scheduled_at,
+                database.Reminder.id,
+                database.Reminder.user_id,
+            )
+            .order_by(database.Reminder.scheduled_at, database.Reminder.id)
+            .execution_options(yield_per=BATCH_SIZE)
+        )
+
+        async for partition in result.partitions():
+            rows.extend(tuple(row) for row in partition)
+
+    return rows
+
+
+async def load():
+    shards = await database.fan_out(load_shard)
+
+    # Строки приходят отсортированными, поэтому список уже является кучей
+    if len(shards) == 1:
+        queue[:] = shards[0]
+    else:
+        queue[:] = heapq.merge(*shards)
+
+    now = time.time()
+    expired = 0
+    while queue and queue[0][0] < now - CATCH_UP_WINDOW:
+        heapq.heappop(queue)
+        expired += 1
+
+    overdue = sum(1 for entry in queue if entry[0] <= now)
+    logger.info(
+        "Loaded %s reminders (%s overdue to catch up, %s expired)",
+        len(queue),
+        overdue,
+        expired,
+    )
+
+
+async def send(bot, semaphore, reminder):
+    async with semaphore:
+        try:
+            await bot.send_message(
+                reminder.chat_id, text=f"Напоминание: {reminder.header} 📌"
+            )
+            return "delivered"
+
+        except FINAL_ERRORS as e:
+            logger.info("Dropping reminder %s: %s", reminder.id, e)
+            return "dropped"
+
+        except Exception as e:
+            logger.warning("Failed to deliver reminder %s: %s", reminder.id, e)
+            return "failed"
+
+
+def take_due(now):
+    due = []
+    while queue and queue[0][0] <= now and len(due) < MAX_BATCH:
+        due.append(heapq.heappop(queue))
+    return due
+
+
+def group_by_shard(entries):
+    shards = {}
+    for entry in entries:
+        shards.setdefault(database.get_shard(entry[-1]), []).append(entry[1])
+    return shards
+
+
+async def claim(shard, ids):
+    async with database.get_session(shard=shard) as session:
+        result = await session.execute(
+            select(database.Reminder).where(database.Reminder.id.in_(ids))
+        )
+        return result.scalars().all()
+
+
+async def remove(shard, ids):
+    async with database.get_session(shard=shard) as session:
+        await session.execute(
+            delete(database.Reminder).where(database.Reminder.id.in_(ids))
+        )
+
+
+async def dispatch(bot, due, handled):
+    started = time.time()
+
+    claimed = await asyncio.gather(
+        *(claim(shard, ids) for shard, ids in group_by_shard(due).items())
+    )
+    reminders = sum(claimed, [])
+
+    semaphore = asyncio.Semaphore(PARALLELISM)
+    results = await asyncio.gather(
+        *(send(bot, semaphore, reminder) for reminder in reminders)
+    )
+
+    delivered = [r.id for r, result in zip(reminders, results) if result == "delivered"]
+    dropped = [r.id for r, result in zip(reminders, results) if result == "dropped"]
+    failed = [r for r, result in zip(reminders, results) if result == "failed"]
+    expired = [r.id for r in failed if r.scheduled_at < started - CATCH_UP_WINDOW]
+
+    for reminder in failed:
+        if reminder.id not in expired:
+            add(reminder.id, started + RETRY_DELAY, reminder.user_id)
+
+    # Дальше сообщения уже отправлены: при сбое удаления пачку не возвращаем
+    handled.update(entry[1] for entry in due)
+
+    done = set(delivered) | set(dropped) | set(expired)
+    done_by_shard = group_by_shard(
+        (r.scheduled_at, r.id, r.user_id) for r in reminders if r.id in done
+    )
+    await asyncio.gather(*(remove(shard, ids) for shard, ids in done_by_shard.items()))
+
+    for user_id in {reminder.user_id for reminder in reminders}:
+        paginator.invalidate(database.Reminder, user_id)
+
+    finished = time.time()
+    tick = {
+        "claimed": len(reminders),
+        "delivered": len(delivered),
+        "failed": len(failed),
+        "dropped": len(dropped),
+        "duration": finished - started,
+        "throughput": len(delivered) / max(finished - started, 1e-6),
+        "lag": started - due[0][0],
+    }
+    metrics["last_tick"] = tick
+    metrics["ticks"] += 1
+    metrics["delivered"] += len(delivered)
+    metrics["failed"] += len(failed)
+    metrics["dropped"] += len(dropped)
+    metrics["max_lag"] = max(metrics["max_lag"], tick["lag"])
+
+    logger.info(
+        "Reminders tick: %(delivered)s/%(claimed)s delivered in %(duration).3f s "
+        "(%(throughput).1f msg/s, lag %(lag).3f s)",
+        tick,
+    )
+
+
+async def run():
+    while True:
+        wakeup.clear()
+
+        if not queue:
+            await wakeup.wait()
+            continue
+
+        # Просыпаемся на границе тика, чтобы собрать всплеск напоминаний в одну пачку
+        now = time.time()
+        wake_at = math.ceil(queue[0][0] / TICK) * TICK
+        if wake_at > now:
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=wake_at - now)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        due = take_due(now)
+        handled = set()
+        try:
+            await dispatch(state["bot"], due, handled)
+
+        except Exception as e:
+            logger.warning("Failed to dispatch %s reminders: %s", len(due), e)
+            for scheduled_at, reminder_id, user_id in due:
+                if reminder_id not in handled:
+                    heapq.heappush(queue, (now + RETRY_DELAY, reminder_id, user_id))
+
+
+async def start(bot):
+    state["bot"] = bot
+    await load()
+    state["task"] = asyncio.get_running_loop().create_task(run())
+
+
+async def stop():
+    task = state["task"]
+    if not task:
+        return
+
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+    state["task"] = None
@@ -11,7 +11,8 @@ from telegram.ext import (
 )
 
 import src.database as database
-from src.main_menu import *
+import src.speech_clients as speech_clients
+import src.user_settings as user_settings
 
 
 async def handle_settings_menu(update, context):
@@ -71,20 +72,10 @@ async def handle_salute_speech_entering(update, context):
     salute_speech = update.message.text
 
     try:
-        async with database.get_session() as session:
-            result = await session.execute(
-                select(database.Setting)
-                .where(database.Setting.user_id == user_id)
-                .limit(1)
-            )
+        previous = await user_settings.set(user_id, salute_speech=salute_speech)
 
-            setting = result.scalar_one_or_none()
-            if not setting:
-                setting = database.Setting(user_id=user_id, salute_speech=salute_speech)
-
-                session.add(setting)
-
-            setting.salute_speech = salute_speech
+        if previous and previous["salute_speech"] != salute_speech:
+            speech_clients.evict(previous["salute_speech"])
 
         await update.message.reply_text("SaluteSpeech Token успешно записан! 🎉")
         await handle_settings_menu(update, context)
@@ -93,3 +84,13 @@ async def handle_salute_speech_entering(update, context):
         await update.message.reply_text(
             "Что-то пошло не так... 😓\n" "Попробуй ещё раз!" f"\n\n{e}"
         )
+
+
+ROUTES = {
+    "Настройки ⚙️": handle_settings_menu,
+    "SaluteSpeech 🎉": handle_salute_speech,
+}
+
+STATES = {
+    "ENTERING_SALUTE_SPEECH_TOKEN": handle_salute_speech_entering,
+}
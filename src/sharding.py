@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import delete, select
+
+import src.database as database
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1_000
+MODELS = (
+    database.Mindflow,
+    database.Reflection,
+    database.Reminder,
+    database.Setting,
+    database.UserData,
+)
+
+
+async def move_batch(model, source, shards):
+    async with database.get_session(shard=source) as session:
+        result = await session.execute(
+            select(model.__table__)
+            .where(model.user_id % shards != source)
+            .limit(BATCH_SIZE)
+        )
+        rows = [dict(row) for row in result.mappings()]
+
+    if not rows:
+        return 0
+
+    targets = {}
+    for row in rows:
+        targets.setdefault(row["user_id"] % shards, []).append(row)
+
+    # Сначала пишем в целевой шард, потом удаляем из исходного: повторный
+    # запуск после падения просто пропустит уже перенесённые строки
+    for target, target_rows in targets.items():
+        async with database.get_session(shard=target) as session:
+            await session.execute(
+                database.insert(model).on_conflict_do_nothing(), target_rows
+            )
+
+    key = model.__mapper__.primary_key[0]
+    async with database.get_session(shard=source) as session:
+        await session.execute(
+            delete(model).where(key.in_([row[key.name] for row in rows]))
+        )
+
+    return len(rows)
+
+
+async def reshard(source_shards, target_shards):
+    moved = {model.__tablename__: 0 for model in MODELS}
+
+    for source in range(source_shards):
+        for model in MODELS:
+            while count := await move_batch(model, source, target_shards):
+                moved[model.__tablename__] += count
+
+        logger.info("Shard %s rebalanced", source)
+
+    return moved
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Перераспределение пользователей между шардами SQLite"
+    )
+    parser.add_argument("--from", dest="source", type=int, required=True)
+    parser.add_argument("--to", dest="target", type=int, required=True)
+    args = parser.parse_args()
+
+    # Бот на время переноса должен быть остановлен
+    database.bind(
+        *(
+            database.make_engine(database.get_url(shard=shard))
+            for shard in range(max(args.source, args.target))
+        )
+    )
+    await database.init()
+
+    moved = await reshard(args.source, args.target)
+    for table, count in moved.items():
+        print(f"{table}: перенесено {count}")
+
+    if args.target < args.source:
+        print(f"Шарды {args.target}..{args.source - 1} пусты и могут быть удалены")
+    print(f"Запускайте бота с DATABASE_SHARDS={args.target}")
+
+    for engine in database.engines:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+MAX_CLIENTS = int(os.getenv("SALUTE_SPEECH_MAX_CLIENTS", 256))
+HTTP_POOL_SIZE = int(os.getenv("SALUTE_SPEECH_HTTP_POOL_SIZE", 20))
+TOKEN_REFRESH_MARGIN = 60
+
+clients = OrderedDict()
+metrics = {"hits": 0, "misses": 0, "evictions": 0, "token_refreshes": 0}
+
+SaluteSpeechClient = None
+http = None
+
+
+def setup():
+    global SaluteSpeechClient, http
+
+    if http:
+        return
+
+    # salute_speech тянет за собой requests и pydub - это сотни миллисекунд на
+    # старте, поэтому грузим его при первом голосовом, а не при импорте
+    import requests
+    import salute_speech.speech_recognition as speech_recognition
+    import salute_speech.utils.token as token
+    from requests.adapters import HTTPAdapter
+    from salute_speech.utils.const import SALUTE_SPEECH_HTTP_TIMEOUT
+    from salute_speech.utils.package import get_config_path
+
+    def secure_post(url, timeout=SALUTE_SPEECH_HTTP_TIMEOUT, **kwargs):
+        return http.post(
+            url, timeout=timeout, verify=get_config_path("russian.pem"), **kwargs
+        )
+
+    def secure_get(url, timeout=SALUTE_SPEECH_HTTP_TIMEOUT, **kwargs):
+        return http.get(
+            url, timeout=timeout, verify=get_config_path("russian.pem"), **kwargs
+        )
+
+    http = requests.Session()
+    http.mount("https://", HTTPAdapter(pool_maxsize=HTTP_POOL_SIZE))
+
+    # salute_speech ходит в сеть через requests.post без сессии, то есть с новым
+    # TLS-соединением на каждый запрос; подменяем на общий пул keep-alive соединений
+    speech_recognition.russian_secure_post = secure_post
+    speech_recognition.russian_secure_get = secure_get
+    token.russian_secure_post = secure_post
+
+    SaluteSpeechClient = speech_recognition.SaluteSpeechClient
+
+
+async def refresh_token(client):
+    token_manager = client.token_manager
+    expiry = token_manager.token_expiry
+    if expiry and expiry / 1000 - time.time() > TOKEN_REFRESH_MARGIN:
+        return
+
+    # Обновляем заранее, чтобы запрос на распознавание не упёрся в истёкший токен
+    token_manager.token_expiry = None
+    await asyncio.to_thread(token_manager.get_valid_token)
+    metrics["token_refreshes"] += 1
+
+
+async def get_client(credentials):
+    client = clients.get(credentials)
+
+    if client:
+        clients.move_to_end(credentials)
+        metrics["hits"] += 1
+    else:
+        setup()
+        client = SaluteSpeechClient(client_credentials=credentials)
+        clients[credentials] = client
+        metrics["misses"] += 1
+
+        if len(clients) > MAX_CLIENTS:
+            clients.popitem(last=False)
+            metrics["evictions"] += 1
+
+    await refresh_token(client)
+    return client
+
+
+def evict(credentials):
+    if clients.pop(credentials, None):
+        metrics["evictions"] += 1
@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+
+import src.database as database
+import src.user_stats as user_stats
+
+TIME_SPENT_BUCKETS = (0, 1, 2)
+
+
+async def fetch_user_stats(session, user_id):
+    return await session.get(database.UserStat, user_id)
+
+
+async def fetch_count(session, model, user_id):
+    user_stat = await fetch_user_stats(session, user_id)
+    if not user_stat:
+        return 0
+    return getattr(user_stat, model.__tablename__)
+
+
+async def get_count(model, user_id):
+    async with database.get_session(user_id) as session:
+        return await fetch_count(session, model, user_id)
+
+
+async def get_reflection_stats(user_id):
+    stats = {
+        "total": 0,
+        "successful": 0,
+        "time_spent": {bucket: 0 for bucket in TIME_SPENT_BUCKETS},
+    }
+
+    async with database.get_session(user_id) as session:
+        user_stat = await fetch_user_stats(session, user_id)
+
+    if user_stat:
+        stats["total"] = user_stat.reflections
+        stats["successful"] = user_stat.reflections_successful
+        for bucket in TIME_SPENT_BUCKETS:
+            stats["time_spent"][bucket] = getattr(
+                user_stat, f"reflections_time_spent_{bucket}"
+            )
+
+    return stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Проверка и пересборка счётчиков user_stats"
+    )
+    parser.add_argument("command", choices=["check", "rebuild"])
+    args = parser.parse_args()
+
+    await database.init()
+
+    async def process(shard):
+        async with database.engines[shard].begin() as conn:
+            drifted = await conn.run_sync(user_stats.check)
+            if args.command == "rebuild":
+                await conn.run_sync(user_stats.rebuild)
+            return drifted
+
+    drifted = sum(await database.fan_out(process), [])
+    print(f"Расхождений в счётчиках: {len(drifted)}")
+    for user_id in drifted[:20]:
+        print(f"  user_id={user_id}")
+
+    if args.command == "rebuild":
+        print("Счётчики пересобраны")
+
+    for engine in database.engines:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
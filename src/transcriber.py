@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+import src.tts as tts
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(os.getenv("TRANSCRIPTION_WORKERS", 4))
+QUEUE_SIZE = int(os.getenv("TRANSCRIPTION_QUEUE_SIZE", 100))
+USER_QUEUE_SIZE = int(os.getenv("TRANSCRIPTION_USER_QUEUE_SIZE", 5))
+
+# Голосовые каждого пользователя обрабатываются по очереди, а сами
+# пользователи обслуживаются по кругу, чтобы один не занял всех воркеров
+jobs = {}
+users = deque()
+ready = asyncio.Semaphore(0)
+state = {"tasks": [], "busy": 0}
+metrics = {
+    "submitted": 0,
+    "completed": 0,
+    "failed": 0,
+    "shed": 0,
+    "depth": 0,
+    "max_depth": 0,
+    "last_wait": None,
+    "max_wait": 0.0,
+    "last_duration": None,
+}
+
+
+async def transcribe(update, context, save, recognize):
+    try:
+        text = await recognize(update, context)
+
+    except Exception as e:
+        await update.message.reply_text(
+            "Не удалось распознать голосовое... 😓\n" "Попробуй ещё раз!" f"\n\n{e}"
+        )
+        return False
+
+    await save(text)
+    return True
+
+
+def take():
+    user_id = users.popleft()
+    metrics["depth"] -= 1
+    return user_id, jobs[user_id].popleft()
+
+
+def release(user_id):
+    if jobs[user_id]:
+        users.append(user_id)
+        ready.release()
+    else:
+        del jobs[user_id]
+
+
+async def work():
+    while True:
+        await ready.acquire()
+        user_id, (update, context, save, enqueued_at) = take()
+
+        started = time.time()
+        metrics["last_wait"] = started - enqueued_at
+        metrics["max_wait"] = max(metrics["max_wait"], metrics["last_wait"])
+
+        state["busy"] += 1
+        saved = False
+        try:
+            saved = await transcribe(update, context, save, tts.recognize)
+
+        except Exception as e:
+            logger.warning("Failed to handle voice message of %s: %s", user_id, e)
+
+        finally:
+            state["busy"] -= 1
+            metrics["completed" if saved else "failed"] += 1
+            metrics["last_duration"] = time.time() - started
+            release(user_id)
+
+
+async def submit(update, context, save):
+    if not update.message.voice:
+        return await save(update.message.text)
+
+    if not state["tasks"]:
+        return await transcribe(update, context, save, tts.ensure_text_message)
+
+    # Уже распознанное голосовое отдаём сразу, минуя очередь
+    text = await tts.get_cached_text(update)
+    if text:
+        return await save(text)
+
+    user_id = update.effective_user.id
+    queue = jobs.get(user_id)
+    if metrics["depth"] >= QUEUE_SIZE or (queue and len(queue) >= USER_QUEUE_SIZE):
+        metrics["shed"] += 1
+        return await update.message.reply_text(
+            "Сейчас слишком много голосовых... 😓\n" "Попробуй чуть позже!"
+        )
+
+    await update.message.reply_text("Распознаю… ⏳")
+
+    if queue is None:
+        queue = jobs[user_id] = deque()
+        users.append(user_id)
+        ready.release()
+
+    queue.append((update, context, save, time.time()))
+    metrics["submitted"] += 1
+    metrics["depth"] += 1
+    metrics["max_depth"] = max(metrics["max_depth"], metrics["depth"])
+
+
+def start():
+    loop = asyncio.get_running_loop()
+    state["tasks"] = [loop.create_task(work()) for _ in range(WORKERS)]
+
+
+async def stop():
+    tasks = state["tasks"]
+    if not tasks:
+        return
+
+    # Пользователям уже ответили "распознаю", поэтому принятое доделываем
+    state["tasks"] = []
+    while metrics["depth"] or state["busy"]:
+        await asyncio.sleep(0.1)
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,84 @@
+import logging
+import os
+import time
+
+from sqlalchemy import delete, select
+
+import src.database as database
+
+logger = logging.getLogger(__name__)
+
+TTL = float(os.getenv("TRANSCRIPTION_CACHE_TTL", 30 * 24 * 60 * 60))
+MAX_SIZE = int(os.getenv("TRANSCRIPTION_CACHE_SIZE", 100_000))
+
+metrics = {"hits": 0, "misses": 0, "hit_rate": 0.0, "bytes_saved": 0, "evicted": 0}
+
+
+# Кэш не привязан к пользователю (одно голосовое пересылают разным людям),
+# поэтому живёт в нулевом шарде
+async def get(file_unique_id, language, file_size=None):
+    async with database.get_session() as session:
+        result = await session.execute(
+            select(database.Transcription.text).where(
+                database.Transcription.file_unique_id == file_unique_id,
+                database.Transcription.language == language,
+                database.Transcription.created_at >= time.time() - TTL,
+            )
+        )
+        text = result.scalar_one_or_none()
+
+    if text is None:
+        metrics["misses"] += 1
+    else:
+        metrics["hits"] += 1
+        metrics["bytes_saved"] += file_size or 0
+    metrics["hit_rate"] = metrics["hits"] / (metrics["hits"] + metrics["misses"])
+    return text
+
+
+async def put(file_unique_id, language, text):
+    async with database.get_session() as session:
+        await session.execute(
+            database.upsert(
+                database.Transcription,
+                {
+                    "file_unique_id": file_unique_id,
+                    "language": language,
+                    "created_at": time.time(),
+                    "text": text,
+                },
+                index_elements=["file_unique_id", "language"],
+                update_columns=["created_at", "text"],
+            )
+        )
+
+
+async def evict():
+    async with database.get_session() as session:
+        result = await session.execute(
+            delete(database.Transcription).where(
+                database.Transcription.created_at < time.time() - TTL
+            )
+        )
+        total = result.rowcount
+
+        # Сверх лимита выкидываем самые старые записи
+        oldest_kept = await session.scalar(
+            select(database.Transcription.created_at)
+            .order_by(database.Transcription.created_at.desc())
+            .offset(MAX_SIZE)
+            .limit(1)
+        )
+        if oldest_kept is not None:
+            result = await session.execute(
+                delete(database.Transcription).where(
+                    database.Transcription.created_at <= oldest_kept
+                )
+            )
+            total += result.rowcount
+
+    if total:
+        metrics["evicted"] += total
+        logger.info("Evicted %s cached transcriptions", total)
+
+    return total
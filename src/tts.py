@@ -1,65 +1,91 @@
 import io
+import os
+import tempfile
+import time
 
-import aiofiles.os as aios
-from salute_speech.speech_recognition import SaluteSpeechClient
 from sqlalchemy import func, select
 
-import src.database as database
+import src.asr as asr
+import src.instrumentation as instrumentation
+import src.transcription_cache as transcription_cache
+import src.user_settings as user_settings
+
+LANGUAGE = "ru-RU"
+VOICE_MEMORY_LIMIT = int(os.getenv("VOICE_MEMORY_LIMIT", 10 * 1024 * 1024))
 
 
 async def get_api_token(update, context):
     try:
         user_id = update.effective_user.id
-
-        async with database.get_session() as session:
-            result = await session.execute(
-                select(database.Setting)
-                .where(database.Setting.user_id == user_id)
-                .limit(1)
-            )
-
-            setting = result.scalar_one_or_none()
-            if setting.salute_speech:
-                return setting.salute_speech
+        return await user_settings.get(user_id, "salute_speech")
 
     except Exception as e:
         pass
 
 
-async def ensure_text_message(update, context):
-    if update.message.text:
-        return update.message.text
+def make_voice_buffer(file_size):
+    # Буфер избавляет только от нашей копии на диске: salute_speech при
+    # распознавании всё равно пишет клип во временный файл (_detect_params)
+    # Telegram не всегда присылает размер, тогда на диск уходим по факту
+    if not file_size:
+        return tempfile.SpooledTemporaryFile(max_size=VOICE_MEMORY_LIMIT)
+    elif file_size <= VOICE_MEMORY_LIMIT:
+        return io.BytesIO()
+
+    return tempfile.TemporaryFile()
+
+
+async def reply_recognized(update, text):
+    await update.message.reply_text("Распознанный текст:")
+    await update.message.reply_text(text)
 
-    elif update.message.voice:
-        api_token = await get_api_token(update, context)
-        file_id = update.message.voice.file_id
-        voice_file = await context.bot.get_file(file_id)
-        file_path = f"data/{file_id}.oga"
-        text = None
-        try:
-            client = SaluteSpeechClient(client_credentials=api_token)
 
-            await voice_file.download_to_drive(file_path)
+async def get_cached_text(update):
+    voice = update.message.voice
+    text = await transcription_cache.get(
+        voice.file_unique_id, LANGUAGE, voice.file_size
+    )
+    if text:
+        await reply_recognized(update, text)
+    return text
 
-            with open(file_path, "rb") as audio_file:
-                result = await client.audio.transcriptions.create(
-                    file=audio_file, language="ru-RU"
-                )
 
-                text = result.text
+async def recognize(update, context):
+    api_token = await get_api_token(update, context)
+    file_id = update.message.voice.file_id
+    voice_file = await context.bot.get_file(file_id)
+    audio_file = make_voice_buffer(update.message.voice.file_size)
+    text = None
+    try:
+        await voice_file.download_to_memory(audio_file)
+        audio_file.seek(0)
+
+        started = time.perf_counter()
+        text = await asr.provider.transcribe(api_token, audio_file, LANGUAGE)
+        instrumentation.observe("transcription_seconds", time.perf_counter() - started)
+        await transcription_cache.put(
+            update.message.voice.file_unique_id, LANGUAGE, text
+        )
+
+    except Exception:
+        pass
+
+    finally:
+        audio_file.close()
 
-        except Exception:
-            pass
+        if not text:
+            raise RuntimeError(
+                "Некорректный токен SaluteSpeech или не удалось распознать сообщение"
+            )
 
-        finally:
-            await aios.remove(file_path)
+        await reply_recognized(update, text)
 
-            if not text:
-                raise RuntimeError(
-                    "Некорректный токен SaluteSpeech или не удалось распознать сообщение"
-                )
+        return text
 
-            await update.message.reply_text("Распознанный текст:")
-            await update.message.reply_text(text)
 
-            return text
+async def ensure_text_message(update, context):
+    if update.message.text:
+        return update.message.text
+
+    elif update.message.voice:
+        return await get_cached_text(update) or await recognize(update, context)
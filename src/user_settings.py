@@ -0,0 +1,80 @@
+import os
+import time
+from collections import OrderedDict
+
+from sqlalchemy import select
+
+import src.database as database
+
+TTL = float(os.getenv("SETTINGS_CACHE_TTL", 10 * 60))
+MAX_SIZE = int(os.getenv("SETTINGS_CACHE_SIZE", 10_000))
+
+# Новые настройки пользователя добавляются колонкой в Setting и именем сюда
+COLUMNS = ("salute_speech",)
+
+# user_id -> (expires_at, настройки); None запоминаем, чтобы не ходить в базу
+# за пользователями, которые ничего не настраивали
+cache = OrderedDict()
+metrics = {"hits": 0, "misses": 0}
+
+
+def store(user_id, values):
+    cache[user_id] = (time.monotonic() + TTL, values)
+    cache.move_to_end(user_id)
+    if len(cache) > MAX_SIZE:
+        cache.popitem(last=False)
+
+
+async def load(user_id):
+    columns = [getattr(database.Setting, name) for name in COLUMNS]
+    async with database.get_session(user_id) as session:
+        result = await session.execute(
+            select(*columns).where(database.Setting.user_id == user_id)
+        )
+        row = result.one_or_none()
+
+    return dict(row._mapping) if row else None
+
+
+async def get_settings(user_id):
+    entry = cache.get(user_id)
+    if entry and entry[0] > time.monotonic():
+        cache.move_to_end(user_id)
+        metrics["hits"] += 1
+        return entry[1]
+
+    metrics["misses"] += 1
+    values = await load(user_id)
+    store(user_id, values)
+    return values
+
+
+async def get(user_id, name, default=None):
+    values = await get_settings(user_id)
+    if not values or values[name] is None:
+        return default
+    return values[name]
+
+
+async def set(user_id, **values):
+    previous = await get_settings(user_id)
+
+    async with database.get_session(user_id) as session:
+        await session.execute(
+            database.upsert(
+                database.Setting,
+                {"user_id": user_id, **values},
+                index_elements=["user_id"],
+                update_columns=list(values),
+            )
+        )
+
+    store(user_id, {**(previous or {}), **values})
+    return previous
+
+
+def invalidate(user_id=None):
+    if user_id is None:
+        cache.clear()
+    else:
+        cache.pop(user_id, None)
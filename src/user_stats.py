@@ -0,0 +1,207 @@
+from sqlalchemy import text
+
+COLUMNS = (
+    "mindflows",
+    "reflections",
+    "reflections_successful",
+    "reflections_time_spent_0",
+    "reflections_time_spent_1",
+    "reflections_time_spent_2",
+    "reminders",
+)
+
+SQLITE_TRIGGERS = {
+    "user_stats_mindflows_insert": """
+        AFTER INSERT ON mindflows
+        BEGIN
+            INSERT OR IGNORE INTO user_stats (user_id) VALUES (NEW.user_id);
+            UPDATE user_stats SET mindflows = mindflows + 1
+            WHERE user_id = NEW.user_id;
+        END
+    """,
+    "user_stats_mindflows_delete": """
+        AFTER DELETE ON mindflows
+        BEGIN
+            UPDATE user_stats SET mindflows = mindflows - 1
+            WHERE user_id = OLD.user_id;
+        END
+    """,
+    "user_stats_reflections_insert": """
+        AFTER INSERT ON reflections
+        BEGIN
+            INSERT OR IGNORE INTO user_stats (user_id) VALUES (NEW.user_id);
+            UPDATE user_stats SET
+                reflections = reflections + 1,
+                reflections_successful =
+                    reflections_successful + NEW.is_interrupt_successfull,
+                reflections_time_spent_0 =
+                    reflections_time_spent_0 + (NEW.time_spent = 0),
+                reflections_time_spent_1 =
+                    reflections_time_spent_1 + (NEW.time_spent = 1),
+                reflections_time_spent_2 =
+                    reflections_time_spent_2 + (NEW.time_spent = 2)
+            WHERE user_id = NEW.user_id;
+        END
+    """,
+    "user_stats_reflections_delete": """
+        AFTER DELETE ON reflections
+        BEGIN
+            UPDATE user_stats SET
+                reflections = reflections - 1,
+                reflections_successful =
+                    reflections_successful - OLD.is_interrupt_successfull,
+                reflections_time_spent_0 =
+                    reflections_time_spent_0 - (OLD.time_spent = 0),
+                reflections_time_spent_1 =
+                    reflections_time_spent_1 - (OLD.time_spent = 1),
+                reflections_time_spent_2 =
+                    reflections_time_spent_2 - (OLD.time_spent = 2)
+            WHERE user_id = OLD.user_id;
+        END
+    """,
+    "user_stats_reminders_insert": """
+        AFTER INSERT ON reminders
+        BEGIN
+            INSERT OR IGNORE INTO user_stats (user_id) VALUES (NEW.user_id);
+            UPDATE user_stats SET reminders = reminders + 1
+            WHERE user_id = NEW.user_id;
+        END
+    """,
+    "user_stats_reminders_delete": """
+        AFTER DELETE ON reminders
+        BEGIN
+            UPDATE user_stats SET reminders = reminders - 1
+            WHERE user_id = OLD.user_id;
+        END
+    """,
+}
+
+POSTGRESQL_FUNCTIONS = {
+    "mindflows": """
+        UPDATE user_stats SET mindflows = mindflows + delta
+        WHERE user_id = row.user_id;
+    """,
+    "reflections": """
+        UPDATE user_stats SET
+            reflections = reflections + delta,
+            reflections_successful =
+                reflections_successful + delta * row.is_interrupt_successfull::int,
+            reflections_time_spent_0 =
+                reflections_time_spent_0 + delta * (row.time_spent = 0)::int,
+            reflections_time_spent_1 =
+                reflections_time_spent_1 + delta * (row.time_spent = 1)::int,
+            reflections_time_spent_2 =
+                reflections_time_spent_2 + delta * (row.time_spent = 2)::int
+        WHERE user_id = row.user_id;
+    """,
+    "reminders": """
+        UPDATE user_stats SET reminders = reminders + delta
+        WHERE user_id = row.user_id;
+    """,
+}
+
+EXPECTED = """
+    SELECT
+        user_id,
+        SUM(mindflows),
+        SUM(reflections),
+        SUM(reflections_successful),
+        SUM(reflections_time_spent_0),
+        SUM(reflections_time_spent_1),
+        SUM(reflections_time_spent_2),
+        SUM(reminders)
+    FROM (
+        SELECT
+            user_id,
+            COUNT(*) AS mindflows,
+            0 AS reflections,
+            0 AS reflections_successful,
+            0 AS reflections_time_spent_0,
+            0 AS reflections_time_spent_1,
+            0 AS reflections_time_spent_2,
+            0 AS reminders
+        FROM mindflows GROUP BY user_id
+        UNION ALL
+        SELECT
+            user_id,
+            0,
+            COUNT(*),
+            SUM(CASE WHEN is_interrupt_successfull THEN 1 ELSE 0 END),
+            SUM(CASE WHEN time_spent = 0 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN time_spent = 1 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN time_spent = 2 THEN 1 ELSE 0 END),
+            0
+        FROM reflections GROUP BY user_id
+        UNION ALL
+        SELECT user_id, 0, 0, 0, 0, 0, 0, COUNT(*)
+        FROM reminders GROUP BY user_id
+    ) AS counters
+    GROUP BY user_id
+"""
+
+
+def create_postgresql_triggers(conn):
+    for table, body in POSTGRESQL_FUNCTIONS.items():
+        conn.execute(
+            text(
+                f"""
+                CREATE OR REPLACE FUNCTION user_stats_{table}() RETURNS trigger AS $$
+                DECLARE
+                    row {table}%ROWTYPE;
+                    delta integer;
+                BEGIN
+                    IF TG_OP = 'INSERT' THEN
+                        row := NEW;
+                        delta := 1;
+                        INSERT INTO user_stats (user_id) VALUES (NEW.user_id)
+                        ON CONFLICT (user_id) DO NOTHING;
+                    ELSE
+                        row := OLD;
+                        delta := -1;
+                    END IF;
+                    {body}
+                    RETURN NULL;
+                END
+                $$ LANGUAGE plpgsql
+                """
+            )
+        )
+        conn.execute(text(f"DROP TRIGGER IF EXISTS user_stats_{table} ON {table}"))
+        conn.execute(
+            text(
+                f"CREATE TRIGGER user_stats_{table} AFTER INSERT OR DELETE ON {table} "
+                f"FOR EACH ROW EXECUTE FUNCTION user_stats_{table}()"
+            )
+        )
+
+
+def create_triggers(conn):
+    if conn.dialect.name == "postgresql":
+        return create_postgresql_triggers(conn)
+
+    for name, body in SQLITE_TRIGGERS.items():
+        conn.execute(text(f"CREATE TRIGGER IF NOT EXISTS {name} {body}"))
+
+
+def rebuild(conn):
+    conn.execute(text("DELETE FROM user_stats"))
+    conn.execute(
+        text(f"INSERT INTO user_stats (user_id, {', '.join(COLUMNS)}) {EXPECTED}")
+    )
+
+
+def check(conn):
+    expected = {row[0]: tuple(row[1:]) for row in conn.execute(text(EXPECTED)).all()}
+    stored = {
+        row[0]: tuple(row[1:])
+        for row in conn.execute(
+            text(f"SELECT user_id, {', '.join(COLUMNS)} FROM user_stats")
+        ).all()
+    }
+
+    zeros = (0,) * len(COLUMNS)
+    return sorted(
+        user_id
+        for user_id in expected.keys() | stored.keys()
+        if expected.get(user_id, zeros) != stored.get(user_id, zeros)
+    )
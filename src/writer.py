@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+
+import src.database as database
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = float(os.getenv("WRITER_FLUSH_INTERVAL", 0))
+BATCH_SIZE = int(os.getenv("WRITER_BATCH_SIZE", 100))
+
+state = {"queue": None, "task": None}
+metrics = {"flushes": 0, "rows": 0, "fallbacks": 0}
+
+
+async def write(records):
+    async with database.get_session(records[0].user_id) as session:
+        session.add_all(records)
+
+
+async def flush_shard(batch):
+    try:
+        await write([record for record, _ in batch])
+
+    except Exception as e:
+        # Одна плохая строка не должна ронять всю пачку
+        logger.warning(
+            "Batch of %s inserts failed, retrying one by one: %s", len(batch), e
+        )
+        metrics["fallbacks"] += 1
+        for record, future in batch:
+            try:
+                await write([record])
+                if not future.done():
+                    future.set_result(record)
+
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+        return
+
+    metrics["flushes"] += 1
+    metrics["rows"] += len(batch)
+    for record, future in batch:
+        # Вызвавший add() мог быть отменён, тогда его future уже завершён
+        if not future.done():
+            future.set_result(record)
+
+
+async def flush(batch):
+    shards = {}
+    for record, future in batch:
+        shards.setdefault(database.get_shard(record.user_id), []).append(
+            (record, future)
+        )
+
+    await asyncio.gather(*(flush_shard(items) for items in shards.values()))
+
+
+async def collect(queue, item):
+    loop = asyncio.get_running_loop()
+    batch = [item]
+    deadline = loop.time() + FLUSH_INTERVAL
+
+    while len(batch) < BATCH_SIZE:
+        if queue.empty():
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+        else:
+            item = queue.get_nowait()
+
+        if item is None:
+            return batch, True
+        batch.append(item)
+
+    return batch, False
+
+
+async def run(queue):
+    while True:
+        item = await queue.get()
+        if item is None:
+            return
+
+        batch, stopped = await collect(queue, item)
+        try:
+            await flush(batch)
+
+        except Exception as e:
+            # Писатель должен пережить сбойную пачку, иначе все следующие add() зависнут
+            logger.warning("Failed to flush %s inserts: %s", len(batch), e)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+        if stopped:
+            return
+
+
+async def add(record):
+    queue = state["queue"]
+    if state["task"] is None:
+        await write([record])
+        return record
+
+    future = asyncio.get_running_loop().create_future()
+    await queue.put((record, future))
+    return await future
+
+
+def start():
+    state["queue"] = asyncio.Queue()
+    state["task"] = asyncio.get_running_loop().create_task(run(state["queue"]))
+
+
+async def stop():
+    task = state["task"]
+    if not task:
+        return
+
+    state["task"] = None
+    await state["queue"].put(None)
+    await task
+
+    # Всё, что успело встать в очередь после стоп-сигнала, пишем напрямую
+    queue = state["queue"]
+    while not queue.empty():
+        item = queue.get_nowait()
+        if item is not None:
+            await flush([item])